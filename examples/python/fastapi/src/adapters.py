@@ -1,7 +1,16 @@
 """Data adapters for PromptChart."""
 
+import asyncio
+import heapq
 from abc import ABC, abstractmethod
-from .types import ChartIntent, ChartData, ChartDataset, Dataset, Filter
+from typing import Any
+
+import numpy as np
+
+from .aggregation import GroupAggregator
+from .filters import compile_filters
+from .timebuckets import parse_day, bucket_ids, bucket_labels, bucket_range
+from .types import ChartIntent, ChartData, ChartDataset, Dataset, Dimension, Filter, Granularity, Metric
 
 # Color palettes for charts
 COLORS = {
@@ -72,7 +81,165 @@ DATASET_METADATA: dict[Dataset, dict[str, list[str]]] = {
 }
 
 
+# Most series (values of the second dimension) drawn on one chart; the smallest series are left out
+MAX_SERIES = 10
+# Label of the group that collects everything beyond an intent's limit when show_other is set
+OTHER_LABEL = "Other"
+
+
+def metric_label(metric: Metric) -> str:
+    return metric.label or f"{metric.aggregation}({metric.field})"
+
+
+def resolve_sort(intent: ChartIntent) -> tuple[str | int, bool] | None:
+    """How to order groups: ("label", descending) or (metric index, descending). None keeps the natural order."""
+    if not intent.sort_by and not intent.sort_order:
+        return None
+    sort_by = intent.sort_by or "value"
+    if sort_by in ("label", "date") or any(d.field == sort_by for d in intent.dimensions or []):
+        key: str | int = "label"
+    else:
+        key = next((i for i, m in enumerate(intent.metrics) if sort_by in (m.field, m.label)), 0)
+    descending = intent.sort_order == "desc" if intent.sort_order else key != "label"
+    return key, descending
+
+
+def build_totals_chart_data(intent: ChartIntent, values: list[float]) -> ChartData:
+    """Build chart data for an intent without dimensions (one value per metric)."""
+    return ChartData(
+        labels=[metric_label(m) for m in intent.metrics],
+        datasets=[ChartDataset(label="Value", data=values, background_color=COLORS["primary"][:len(values)], border_color=COLORS["border"][:len(values)])]
+    )
+
+
+def build_chart_data(intent: ChartIntent, labels: list[str], series: list[list[float] | np.ndarray]) -> ChartData:
+    """Build chart data from one list of values per metric, aligned with labels."""
+    is_pie = intent.chart_type in ("pie", "doughnut")
+    datasets = []
+    for idx, (metric, metric_data) in enumerate(zip(intent.metrics, series)):
+        datasets.append(ChartDataset(
+            label=metric_label(metric),
+            data=metric_data,
+            background_color=COLORS["primary"][:len(labels)] if is_pie else COLORS["primary"][idx % len(COLORS["primary"])],
+            border_color=COLORS["border"][:len(labels)] if is_pie else COLORS["border"][idx % len(COLORS["border"])],
+        ))
+    return ChartData(labels=labels, datasets=datasets)
+
+
+def top_series(sizes: list[int], max_series: int = MAX_SERIES) -> list[int]:
+    """Positions of the largest series (by number of values of the first metric), in their original order."""
+    if len(sizes) <= max_series:
+        return list(range(len(sizes)))
+    return sorted(heapq.nlargest(max_series, range(len(sizes)), key=sizes.__getitem__))
+
+
+def build_series_chart_data(intent: ChartIntent, labels: list[str], series_labels: list[str], series: list[list[list[float] | np.ndarray]]) -> ChartData:
+    """Build chart data with one dataset per value of the second dimension (and per metric when there are several).
+
+    series holds, for each series label, one list of values per metric aligned with labels.
+    """
+    is_pie = intent.chart_type in ("pie", "doughnut")
+    datasets = []
+    for series_label, metric_series in zip(series_labels, series):
+        for metric, metric_data in zip(intent.metrics, metric_series):
+            idx = len(datasets)
+            datasets.append(ChartDataset(
+                label=series_label if len(intent.metrics) == 1 else f"{series_label} - {metric_label(metric)}",
+                data=metric_data,
+                background_color=COLORS["primary"][:len(labels)] if is_pie else COLORS["primary"][idx % len(COLORS["primary"])],
+                border_color=COLORS["border"][:len(labels)] if is_pie else COLORS["border"][idx % len(COLORS["border"])],
+            ))
+    return ChartData(labels=labels, datasets=datasets)
+
+
+def select_groups(intent: ChartIntent, labels: list[str], values: list[float] | None = None) -> list[int]:
+    """Positions of the groups to draw, in order, after the intent's sort and limit.
+
+    values holds the sort metric per group (only needed when sorting by a metric). With a limit only the top
+    groups are selected with a heap instead of sorting every group; ties keep their original order.
+    """
+    sort = resolve_sort(intent)
+    limit = int(intent.limit) if intent.limit else None
+    positions = range(len(labels))
+    if sort is None:
+        return list(positions[:limit])
+    key = labels.__getitem__ if sort[0] == "label" else values.__getitem__
+    if limit is not None and limit < len(labels):
+        return (heapq.nlargest if sort[1] else heapq.nsmallest)(limit, positions, key=key)
+    return sorted(positions, key=key, reverse=sort[1])
+
+
+def rank_groups(intent: ChartIntent, aggregator: GroupAggregator, labels: list[str], field_index: list[int]) -> tuple[list[str], GroupAggregator]:
+    """Apply the intent's sort, limit and Other bucket to groups keyed on (label, series).
+
+    Returns the labels to draw and the groups re-keyed on (position in those labels, series).
+    """
+    sort = resolve_sort(intent)
+    values = None
+    if sort is not None and sort[0] != "label":
+        by_label = aggregator.regroup(lambda key: key[0])
+        values = [by_label.result(label, field_index[sort[0]], intent.metrics[sort[0]].aggregation) for label in labels]
+    kept = select_groups(intent, labels, values)
+    position = {labels[p]: i for i, p in enumerate(kept)}
+    # Groups beyond the limit are merged into one more position, or dropped
+    other = len(kept) if intent.show_other and len(kept) < len(labels) else None
+    regrouped = aggregator.regroup(lambda key: (position.get(key[0], other), key[1]))
+    regrouped.groups = {key: accumulators for key, accumulators in regrouped.groups.items() if key[0] is not None}
+    return [labels[p] for p in kept] + ([OTHER_LABEL] if other is not None else []), regrouped
+
+
+def bucket_groups(aggregator: GroupAggregator, granularity: Granularity) -> tuple[list[str], GroupAggregator]:
+    """Roll groups keyed by (raw date value, series) up into calendar buckets, filling empty buckets in order.
+
+    Only the groups are visited, so a coarser bucket is built from finer groups without rescanning records.
+    """
+    days = {key: parse_day(key) for key, _ in aggregator.groups if key is not None}
+    if not days or None in days.values():
+        # Not a date field: group on the raw values like any other dimension
+        regrouped = aggregator.regroup(lambda key: ("Unknown" if key[0] is None else str(key[0]), key[1]))
+        return list(dict.fromkeys(label for label, _ in regrouped.groups)), regrouped
+
+    # Records without a date have no place on a time axis
+    aggregator.groups = {key: accumulators for key, accumulators in aggregator.groups.items() if key[0] is not None}
+    keys = list(days.keys())
+    ids = bucket_ids(np.array([days[key] for key in keys]), granularity)
+    bucket_of = dict(zip(keys, ids.tolist()))
+    buckets = bucket_range(ids)
+    labels = bucket_labels(buckets, granularity)
+    label_of = dict(zip(buckets.tolist(), labels))
+    # Empty buckets simply have no accumulators and aggregate to 0
+    return labels, aggregator.regroup(lambda key: (label_of[bucket_of[key[0]]], key[1]))
+
+
+def build_grouped_chart_data(intent: ChartIntent, aggregator: GroupAggregator, labels: list[str], field_index: list[int]) -> ChartData:
+    """Build chart data from groups keyed on (label position, series label), series label None when the chart is not split.
+
+    Split charts keep the largest MAX_SERIES series.
+    """
+    if not intent.dimensions or len(intent.dimensions) < 2:
+        series = [[aggregator.result((i, None), f, m.aggregation) for i in range(len(labels))] for f, m in zip(field_index, intent.metrics)]
+        return build_chart_data(intent, labels, series)
+
+    sizes: dict[str, int] = {}
+    for (_, series_label), accumulators in aggregator.groups.items():
+        sizes[series_label] = sizes.get(series_label, 0) + accumulators[field_index[0]].count
+    series_labels = list(sizes.keys())
+    series_labels = [series_labels[i] for i in top_series(list(sizes.values()))]
+    series = [
+        [[aggregator.result((i, series_label), f, m.aggregation) for i in range(len(labels))] for f, m in zip(field_index, intent.metrics)]
+        for series_label in series_labels
+    ]
+    return build_series_chart_data(intent, labels, series_labels, series)
+
+
+class AppendNotSupportedError(Exception):
+    """Raised when records are appended to an adapter over a read-only source."""
+
+
 class DataAdapter(ABC):
+    # Whether append_records is available; adapters over read-only sources leave it False
+    supports_append = False
+
     @abstractmethod
     def get_available_datasets(self) -> list[Dataset]: ...
     @abstractmethod
@@ -82,10 +249,28 @@ class DataAdapter(ABC):
     @abstractmethod
     def execute_query(self, intent: ChartIntent) -> ChartData: ...
 
+    async def aexecute_query(self, intent: ChartIntent) -> ChartData:
+        """Async variant. Adapters without a native async driver run the query in a worker thread."""
+        return await asyncio.to_thread(self.execute_query, intent)
+
+    def get_catalog_version(self) -> str | None:
+        """Cheap token that changes whenever datasets, metrics or dimensions change. None means unknown (re-read periodically)."""
+        return None
+
+    def append_records(self, dataset: Dataset, records: list[dict[str, Any]]) -> None:
+        """Add a batch of records to a dataset. Only available when supports_append is set."""
+        raise AppendNotSupportedError(f"Dataset {dataset} is read-only: {type(self).__name__} does not support appending records")
+
 
 class MockDataAdapter(DataAdapter):
+    supports_append = True
+
+    def __init__(self, data: dict[Dataset, list[dict]] | None = None):
+        # Copy the lists so appends never touch the module-level mock data
+        self.data = {name: list(records) for name, records in (MOCK_DATA if data is None else data).items()}
+
     def get_available_datasets(self) -> list[Dataset]:
-        return list(MOCK_DATA.keys())
+        return list(self.data.keys())
 
     def get_available_metrics(self, dataset: Dataset) -> list[str]:
         return DATASET_METADATA.get(dataset, {}).get("metrics", [])
@@ -94,7 +279,7 @@ class MockDataAdapter(DataAdapter):
         return DATASET_METADATA.get(dataset, {}).get("dimensions", [])
 
     def execute_query(self, intent: ChartIntent) -> ChartData:
-        data = MOCK_DATA.get(intent.dataset)
+        data = self.data.get(intent.dataset)
         if not data:
             raise ValueError(f"Unknown dataset: {intent.dataset}")
 
@@ -103,78 +288,44 @@ class MockDataAdapter(DataAdapter):
         # Group and aggregate
         return self._group_and_aggregate(filtered, intent)
 
+    def append_records(self, dataset: Dataset, records: list[dict[str, Any]]) -> None:
+        if dataset not in self.data:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        # A single list.extend is atomic, so a running query never sees half a batch
+        self.data[dataset].extend(records)
+
     def _apply_filters(self, data: list[dict], filters: list[Filter] | None) -> list[dict]:
-        if not filters:
+        predicate = compile_filters(filters)
+        if predicate is None:
             return data
-        result = []
-        for record in data:
-            match = all(self._check_filter(record, f) for f in filters)
-            if match:
-                result.append(record)
-        return result
-
-    def _check_filter(self, record: dict, f: Filter) -> bool:
-        value = record.get(f.field)
-        if f.operator == "eq":
-            return value == f.value
-        if f.operator == "neq":
-            return value != f.value
-        if f.operator == "gt":
-            return isinstance(value, (int, float)) and value > f.value
-        if f.operator == "gte":
-            return isinstance(value, (int, float)) and value >= f.value
-        if f.operator == "lt":
-            return isinstance(value, (int, float)) and value < f.value
-        if f.operator == "lte":
-            return isinstance(value, (int, float)) and value <= f.value
-        if f.operator == "in":
-            return isinstance(f.value, list) and value in f.value
-        return True
+        return list(filter(predicate, data))
 
     def _group_and_aggregate(self, data: list[dict], intent: ChartIntent) -> ChartData:
         dimension = intent.dimensions[0] if intent.dimensions else None
+        split = intent.dimensions[1] if intent.dimensions and len(intent.dimensions) > 1 else None
         metrics = intent.metrics
+        # Every requested metric for every group is accumulated in a single pass
+        fields = list(dict.fromkeys(m.field for m in metrics))
+        field_index = [fields.index(m.field) for m in metrics]
+        aggregator = GroupAggregator(fields)
 
         if not dimension:
-            labels = [m.label or f"{m.aggregation}({m.field})" for m in metrics]
-            values = [self._aggregate(data, m.field, m.aggregation) for m in metrics]
-            return ChartData(
-                labels=labels,
-                datasets=[ChartDataset(label="Value", data=values, background_color=COLORS["primary"][:len(values)], border_color=COLORS["border"][:len(values)])]
-            )
-
-        groups: dict[str, list[dict]] = {}
-        for record in data:
-            key = str(record.get(dimension.field, "Unknown"))
-            groups.setdefault(key, []).append(record)
-
-        labels = list(groups.keys())
-        is_pie = intent.chart_type in ("pie", "doughnut")
-
-        datasets = []
-        for idx, metric in enumerate(metrics):
-            metric_data = [self._aggregate(groups[label], metric.field, metric.aggregation) for label in labels]
-            datasets.append(ChartDataset(
-                label=metric.label or f"{metric.aggregation}({metric.field})",
-                data=metric_data,
-                background_color=COLORS["primary"][:len(labels)] if is_pie else COLORS["primary"][idx % len(COLORS["primary"])],
-                border_color=COLORS["border"][:len(labels)] if is_pie else COLORS["border"][idx % len(COLORS["border"])],
-            ))
+            for record in data:
+                aggregator.add(None, record)
+            return build_totals_chart_data(intent, [aggregator.result(None, i, m.aggregation) for i, m in zip(field_index, metrics)])
+
+        # Groups are keyed on (label, series) so a split chart is still built from one pass; unsplit charts have a single series
+        if dimension.granularity:
+            for record in data:
+                aggregator.add((record.get(dimension.field), self._series_key(record, split)), record)
+            labels, aggregator = bucket_groups(aggregator, dimension.granularity)
+        else:
+            for record in data:
+                aggregator.add((str(record.get(dimension.field, "Unknown")), self._series_key(record, split)), record)
+            labels = list(dict.fromkeys(label for label, _ in aggregator.groups))
+
+        labels, aggregator = rank_groups(intent, aggregator, labels, field_index)
+        return build_grouped_chart_data(intent, aggregator, labels, field_index)
 
-        return ChartData(labels=labels, datasets=datasets)
-
-    def _aggregate(self, records: list[dict], field: str, aggregation: str) -> float:
-        values = [r[field] for r in records if isinstance(r.get(field), (int, float))]
-        if not values:
-            return 0.0
-        if aggregation == "sum":
-            return float(sum(values))
-        if aggregation == "avg":
-            return float(sum(values) / len(values))
-        if aggregation == "min":
-            return float(min(values))
-        if aggregation == "max":
-            return float(max(values))
-        if aggregation == "count":
-            return float(len(values))
-        return float(sum(values))
+    def _series_key(self, record: dict, split: Dimension | None) -> str | None:
+        return str(record.get(split.field, "Unknown")) if split else None
@@ -0,0 +1,88 @@
+"""Streaming aggregation state for grouped queries."""
+
+from typing import Any, Callable, Hashable
+
+NUMERIC_TYPES = (int, float)
+
+
+class Accumulator:
+    """Running sum/count/min/max for one metric field in one group."""
+
+    __slots__ = ("sum", "count", "min", "max")
+
+    def __init__(self):
+        self.sum = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    @classmethod
+    def from_state(cls, count: int | float, total: int | float | None, low: int | float | None, high: int | float | None) -> "Accumulator":
+        """An accumulator holding precomputed count/sum/min/max (e.g. from a database or another process)."""
+        accumulator = cls()
+        if count:
+            accumulator.count, accumulator.sum, accumulator.min, accumulator.max = int(count), total, low, high
+        return accumulator
+
+    def add(self, value: int | float) -> None:
+        self.sum += value
+        self.count += 1
+        if self.count == 1:
+            self.min = self.max = value
+        elif value < self.min:
+            self.min = value
+        elif value > self.max:
+            self.max = value
+
+    def merge(self, other: "Accumulator") -> None:
+        if not other.count:
+            return
+        self.min = other.min if not self.count or other.min < self.min else self.min
+        self.max = other.max if not self.count or other.max > self.max else self.max
+        self.sum += other.sum
+        self.count += other.count
+
+    def result(self, aggregation: str) -> float:
+        if not self.count:
+            return 0.0
+        if aggregation == "avg":
+            return float(self.sum / self.count)
+        if aggregation == "min":
+            return float(self.min)
+        if aggregation == "max":
+            return float(self.max)
+        if aggregation == "count":
+            return float(self.count)
+        return float(self.sum)
+
+
+class GroupAggregator:
+    """Accumulates every requested field for every group in a single pass over the records."""
+
+    __slots__ = ("fields", "groups")
+
+    def __init__(self, fields: list[str]):
+        self.fields = fields
+        self.groups: dict[Hashable, list[Accumulator]] = {}
+
+    def add(self, key: Hashable, record: dict[str, Any]) -> None:
+        accumulators = self.groups.get(key)
+        if accumulators is None:
+            accumulators = self.groups[key] = [Accumulator() for _ in self.fields]
+        for accumulator, field in zip(accumulators, self.fields):
+            value = record.get(field)
+            if isinstance(value, NUMERIC_TYPES):
+                accumulator.add(value)
+
+    def result(self, key: Hashable, field_index: int, aggregation: str) -> float:
+        accumulators = self.groups.get(key)
+        return accumulators[field_index].result(aggregation) if accumulators else 0.0
+
+    def regroup(self, key_of: Callable[[Hashable], Hashable]) -> "GroupAggregator":
+        """Merge groups into coarser ones (e.g. days into months) without revisiting the records."""
+        regrouped = GroupAggregator(self.fields)
+        for key, accumulators in self.groups.items():
+            target = regrouped.groups.setdefault(key_of(key), [Accumulator() for _ in self.fields])
+            for merged, accumulator in zip(target, accumulators):
+                merged.merge(accumulator)
+        return regrouped
@@ -8,13 +8,36 @@ from fastapi.middleware.cors import CORSMiddleware
 from dotenv import load_dotenv
 
 from .llm import OpenAIProvider, LLMConfig
-from .adapters import MockDataAdapter
+from .cache import CachedLLMProvider, IntentCache, CachedDataAdapter, ResultCache
+from .keyword_parser import KeywordIntentProvider
+from .adapters import DataAdapter, MockDataAdapter, MOCK_DATA
+from .columnar import ColumnarDataAdapter
+from .store import open_store, write_store
+from .parallel import ParallelColumnarDataAdapter
+from .sql_adapter import SQLiteDataAdapter
+from .rollups import RollupDataAdapter
+from .downsample import parse_targets
 from .intent_resolver import IntentResolver
-from .routes import create_chart_router
+from .routes import create_chart_router, create_ingest_router
 
 load_dotenv()
 
 
+def create_data_adapter(kind: str, rollups: bool = False) -> DataAdapter:
+    if kind == "sqlite":
+        path = os.getenv("SQLITE_PATH")
+        return SQLiteDataAdapter(path) if path else SQLiteDataAdapter.from_records(MOCK_DATA)
+    if kind == "store":
+        path = os.getenv("STORE_PATH", "data")
+        if not os.path.isdir(path):
+            write_store(path)
+        workers = int(os.getenv("PARALLEL_WORKERS", 0))
+        return ParallelColumnarDataAdapter(path, workers) if workers > 1 else open_store(path)
+    adapter = ColumnarDataAdapter() if kind == "columnar" else MockDataAdapter()
+    # Rollups are built from the in-memory records, so they only apply to the in-memory adapters
+    return RollupDataAdapter(adapter) if rollups else adapter
+
+
 def create_app() -> FastAPI:
     app = FastAPI(title="PromptChart")
 
@@ -32,15 +55,35 @@ def create_app() -> FastAPI:
     if not api_key:
         print("Warning: OPENAI_API_KEY not set. LLM features will not work.")
 
-    llm_provider = OpenAIProvider(LLMConfig(
-        api_key=api_key or "",
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-    ))
-    data_adapter = MockDataAdapter()
-    intent_resolver = IntentResolver(llm_provider, data_adapter)
+    llm_provider = CachedLLMProvider(
+        OpenAIProvider(LLMConfig(
+            api_key=api_key or "",
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            timeout=float(os.getenv("LLM_TIMEOUT", 30)),
+            attempt_timeout=float(os.environ["LLM_ATTEMPT_TIMEOUT"]) if os.getenv("LLM_ATTEMPT_TIMEOUT") else None,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", 2)),
+            hedge_after=float(os.environ["LLM_HEDGE_AFTER"]) if os.getenv("LLM_HEDGE_AFTER") else None,
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", 20)),
+            context_tokens=int(os.getenv("LLM_CONTEXT_TOKENS", 2000)) or None,
+        )),
+        IntentCache(
+            max_size=int(os.getenv("INTENT_CACHE_SIZE", 1000)),
+            ttl=float(os.getenv("INTENT_CACHE_TTL", 3600)),
+            path=os.getenv("INTENT_CACHE_PATH"),
+        ),
+    )
+    # Simple prompts are parsed locally; the rest go to the LLM
+    if os.getenv("FAST_PATH", "true").lower() not in ("0", "false", "no"):
+        llm_provider = KeywordIntentProvider(llm_provider)
+    data_adapter = CachedDataAdapter(create_data_adapter(os.getenv("DATA_ADAPTER", "mock"), os.getenv("ROLLUPS", "").lower() in ("1", "true", "yes")), ResultCache(max_size=int(os.getenv("RESULT_CACHE_SIZE", 500))))
+    intent_resolver = IntentResolver(llm_provider, data_adapter, parse_targets(os.getenv("DOWNSAMPLE_POINTS", "")))
 
     # Register routes
     app.include_router(create_chart_router(intent_resolver), prefix="/api/chart")
+    # Writing data is opt-in and token-protected, since CORS lets any page call the API
+    ingest_token = os.getenv("INGEST_TOKEN")
+    if ingest_token:
+        app.include_router(create_ingest_router(data_adapter, ingest_token), prefix="/api/datasets")
 
     @app.get("/health")
     async def health_check():
@@ -49,15 +92,13 @@ def create_app() -> FastAPI:
     return app
 
 
-app = create_app()
-
-
 def main():
     import uvicorn
     port = int(os.getenv("PORT", 3000))
     print(f"PromptChart backend running at http://localhost:{port}")
     print(f"API endpoint: POST http://localhost:{port}/api/chart")
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    # Built here rather than at import time: parallel scan workers are spawned and re-import this module
+    uvicorn.run(create_app(), host="0.0.0.0", port=port)
 
 
 if __name__ == "__main__":
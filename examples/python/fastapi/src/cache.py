@@ -0,0 +1,278 @@
+"""Caching layers for PromptChart."""
+
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from .adapters import DataAdapter
+from .filters import RecordPredicate, compile_filters
+from .llm import LLMProvider, IntentContext, IntentResult, ProgressCallback
+from .types import ChartData, ChartIntent, Dataset, intent_to_dict, intent_from_dict
+
+# Bump when the prompt or intent format changes so stale cached intents are not reused
+INTENT_CACHE_VERSION = 2
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache with optional TTL (seconds) and hit/miss counters."""
+
+    def __init__(self, max_size: int = 1000, ttl: float | None = None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not self._expired(entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, created_at: float | None = None) -> None:
+        with self._lock:
+            self._entries[key] = (time.time() if created_at is None else created_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+
+class IntentCache(LRUCache):
+    """LRU + TTL cache of generated intents, optionally persisted to SQLite so entries survive restarts."""
+
+    def __init__(self, max_size: int = 1000, ttl: float | None = 3600, path: str | None = None):
+        super().__init__(max_size, ttl)
+        self._db: sqlite3.Connection | None = None
+        self._db_lock = threading.Lock()
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS intent_cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)")
+            self._prune()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = super().get(key, _MISSING)
+        if value is not _MISSING or self._db is None:
+            return default if value is _MISSING else value
+        with self._db_lock:
+            row = self._db.execute("SELECT value, created_at FROM intent_cache WHERE key = ?", (key,)).fetchone()
+        if row is None or self._expired(row[1]):
+            return default
+        # Counted as a miss by the in-memory layer; recount it as a hit and promote it so later lookups are memory hits
+        with self._lock:
+            self.misses -= 1
+            self.hits += 1
+        value = json.loads(row[0])
+        super().set(key, value, created_at=row[1])
+        return value
+
+    def set(self, key: Hashable, value: Any, created_at: float | None = None) -> None:
+        created_at = time.time() if created_at is None else created_at
+        super().set(key, value, created_at)
+        if self._db is not None:
+            with self._db_lock, self._db:
+                self._db.execute("INSERT OR REPLACE INTO intent_cache (key, value, created_at) VALUES (?, ?, ?)", (key, json.dumps(value), created_at))
+
+    def clear(self) -> None:
+        super().clear()
+        if self._db is not None:
+            with self._db_lock, self._db:
+                self._db.execute("DELETE FROM intent_cache")
+
+    def _prune(self) -> None:
+        with self._db_lock, self._db:
+            if self.ttl is not None:
+                self._db.execute("DELETE FROM intent_cache WHERE created_at < ?", (time.time() - self.ttl,))
+            self._db.execute(
+                "DELETE FROM intent_cache WHERE key NOT IN (SELECT key FROM intent_cache ORDER BY created_at DESC LIMIT ?)", (self.max_size,)
+            )
+
+
+def normalize_prompt(prompt: str) -> str:
+    """Case-fold, collapse whitespace and drop surrounding punctuation so trivially different prompts share a key."""
+    return re.sub(r"\s+", " ", prompt.casefold()).strip(" \t\n.?!,;:")
+
+
+def intent_cache_key(prompt: str, context: IntentContext) -> str:
+    payload = json.dumps(
+        {
+            "version": INTENT_CACHE_VERSION,
+            "prompt": normalize_prompt(prompt),
+            "catalog": context.version or {"datasets": context.datasets, "chartTypes": context.available_chart_types},
+            "context": context.additional_context,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class CachedLLMProvider(LLMProvider):
+    """Serves repeated prompts from an IntentCache and only calls the wrapped provider on a miss."""
+
+    def __init__(self, provider: LLMProvider, cache: IntentCache | None = None):
+        self.provider = provider
+        self.cache = cache or IntentCache()
+
+    def generate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
+        key = intent_cache_key(prompt, context)
+        return self._lookup(key) or self._store(key, self.provider.generate_intent(prompt, context))
+
+    async def agenerate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
+        key = intent_cache_key(prompt, context)
+        return self._lookup(key) or self._store(key, await self.provider.agenerate_intent(prompt, context))
+
+    def stream_intent(self, prompt: str, context: IntentContext, on_progress: ProgressCallback) -> IntentResult:
+        key = intent_cache_key(prompt, context)
+        return self._lookup(key) or self._store(key, self.provider.stream_intent(prompt, context, on_progress))
+
+    async def astream_intent(self, prompt: str, context: IntentContext, on_progress: ProgressCallback) -> IntentResult:
+        key = intent_cache_key(prompt, context)
+        return self._lookup(key) or self._store(key, await self.provider.astream_intent(prompt, context, on_progress))
+
+    def _lookup(self, key: str) -> IntentResult | None:
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        # Rebuild on every hit so callers can mutate the intent without touching the cache
+        return IntentResult(intent=intent_from_dict(cached["intent"]), raw_response=cached["rawResponse"])
+
+    def _store(self, key: str, result: IntentResult) -> IntentResult:
+        self.cache.set(key, {"intent": intent_to_dict(result.intent), "rawResponse": result.raw_response})
+        return result
+
+
+def query_cache_key(intent: ChartIntent) -> str:
+    """Canonical hash of everything in an intent that affects the query result (filter order and IN value order are irrelevant)."""
+    data = intent_to_dict(intent)
+    data.pop("title", None)
+    filters = []
+    for f in data.get("filters") or []:
+        value = sorted(f["value"], key=repr) if f["operator"] == "in" and isinstance(f["value"], list) else f["value"]
+        filters.append({**f, "value": value})
+    data["filters"] = sorted(filters, key=lambda f: json.dumps(f, sort_keys=True, default=str))
+    return hashlib.sha256(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class ResultCache(LRUCache):
+    """Size-bounded cache of query results keyed on (dataset, intent hash) so a dataset's entries can be dropped together."""
+
+    def invalidate(self, dataset: Dataset | None = None, affected: Callable[[Any], bool] | None = None) -> None:
+        """Drop a dataset's entries (or all entries). With affected, only entries whose value it flags are dropped."""
+        with self._lock:
+            if dataset is None:
+                self._entries.clear()
+                return
+            for key in [key for key, (_, value) in self._entries.items() if key[0] == dataset and (affected is None or affected(value))]:
+                del self._entries[key]
+
+
+class CachedDataAdapter(DataAdapter):
+    """Wraps any DataAdapter and reuses results for identical intents until the dataset is invalidated.
+
+    Each entry keeps the intent's compiled filters, so appending records only drops results whose filters match a new record.
+    """
+
+    def __init__(self, adapter: DataAdapter, cache: ResultCache | None = None):
+        self.adapter = adapter
+        self.cache = cache or ResultCache()
+        # Bumped per dataset (None for all) on every change, so a query that overlapped one does not cache its result
+        self._generations: dict[Dataset | None, int] = {}
+        self._generations_lock = threading.Lock()
+
+    def get_available_datasets(self) -> list[Dataset]:
+        return self.adapter.get_available_datasets()
+
+    def get_available_metrics(self, dataset: Dataset) -> list[str]:
+        return self.adapter.get_available_metrics(dataset)
+
+    def get_available_dimensions(self, dataset: Dataset) -> list[str]:
+        return self.adapter.get_available_dimensions(dataset)
+
+    def get_catalog_version(self) -> str | None:
+        return self.adapter.get_catalog_version()
+
+    def execute_query(self, intent: ChartIntent) -> ChartData:
+        key = (intent.dataset, query_cache_key(intent))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached[1])
+
+        generation = self._generation(intent.dataset)
+        result = self.adapter.execute_query(intent)
+        self._store(key, intent, result, generation)
+        return result
+
+    async def aexecute_query(self, intent: ChartIntent) -> ChartData:
+        key = (intent.dataset, query_cache_key(intent))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return copy.deepcopy(cached[1])
+
+        generation = self._generation(intent.dataset)
+        result = await self.adapter.aexecute_query(intent)
+        self._store(key, intent, result, generation)
+        return result
+
+    @property
+    def supports_append(self) -> bool:
+        return self.adapter.supports_append
+
+    def append_records(self, dataset: Dataset, records: list[dict[str, Any]]) -> None:
+        """Append through the wrapped adapter, then drop only the cached results the new records can change."""
+        self.adapter.append_records(dataset, records)
+        if records:
+            self._bump(dataset)
+            self.cache.invalidate(dataset, lambda entry: self._matches_any(entry[0], records))
+
+    def invalidate(self, dataset: Dataset | None = None) -> None:
+        """Drop cached results for one dataset (or all) after its underlying data changed."""
+        self._bump(dataset)
+        self.cache.invalidate(dataset)
+
+    def _generation(self, dataset: Dataset) -> tuple[int, int]:
+        with self._generations_lock:
+            return self._generations.get(dataset, 0), self._generations.get(None, 0)
+
+    def _bump(self, dataset: Dataset | None) -> None:
+        with self._generations_lock:
+            self._generations[dataset] = self._generations.get(dataset, 0) + 1
+
+    def _store(self, key: tuple[Dataset, str], intent: ChartIntent, result: ChartData, generation: tuple[int, int]) -> None:
+        entry = (compile_filters(intent.filters), copy.deepcopy(result))
+        # Checked and set under the lock, so a bump either happens first and rejects the entry or after and invalidates it
+        with self._generations_lock:
+            if (self._generations.get(intent.dataset, 0), self._generations.get(None, 0)) == generation:
+                self.cache.set(key, entry)
+
+    def _matches_any(self, predicate: RecordPredicate | None, records: list[dict[str, Any]]) -> bool:
+        # Records rejected by an intent's filters never reach its aggregation, so its cached result still holds
+        return predicate is None or any(map(predicate, records))
@@ -0,0 +1,489 @@
+"""Columnar in-memory data adapter backed by NumPy arrays."""
+
+import threading
+from typing import Any, Callable, Iterable
+
+import numpy as np
+
+from .adapters import DataAdapter, MOCK_DATA, DATASET_METADATA, OTHER_LABEL, build_chart_data, build_series_chart_data, build_totals_chart_data, resolve_sort, select_groups, top_series
+from .aggregation import NUMERIC_TYPES
+from .filters import between_bounds, compile_value_predicate
+from .indexes import PostingIndex, SortedIndex
+from .timebuckets import bucket_ids, bucket_labels, bucket_range, parse_day
+from .types import ChartIntent, ChartData, Dataset, Filter, Granularity
+
+# Use an index only when it narrows the scan to at most this fraction of the rows
+INDEX_SELECTIVITY = 0.25
+# Appended rows are scanned until they exceed this fraction of the indexed rows (or REINDEX_MIN_ROWS), then the indexes are rebuilt
+REINDEX_FRACTION = 0.1
+REINDEX_MIN_ROWS = 1024
+
+
+def reserve(buffer: np.ndarray, size: int, extra: int) -> np.ndarray:
+    """A buffer holding the first size items of buffer with room for extra more. Capacity doubles, so appends are amortized O(1) per row."""
+    if size + extra <= len(buffer):
+        return buffer
+    grown = np.empty(max(size + extra, 2 * len(buffer)), dtype=buffer.dtype)
+    grown[:size] = buffer[:size]
+    return grown
+
+
+class NumericColumn:
+    """Float64 values, NaN where the source value is missing or non-numeric."""
+
+    def __init__(self, values: np.ndarray, buffer: np.ndarray | None = None):
+        self.values = values
+        self._buffer = values if buffer is None else buffer
+
+    @classmethod
+    def encode(cls, values: list[Any]) -> "NumericColumn":
+        return cls(np.fromiter((v if isinstance(v, NUMERIC_TYPES) else np.nan for v in values), dtype=np.float64, count=len(values)))
+
+    def appended(self, values: list[Any]) -> "NumericColumn":
+        """A column with values added at the end. Rows past this column's length are never visible through it, so it stays valid."""
+        size = len(self.values)
+        buffer = reserve(self._buffer, size, len(values))
+        buffer[size:size + len(values)] = NumericColumn.encode(values).values
+        return NumericColumn(buffer[:size + len(values)], buffer)
+
+
+class DimensionColumn:
+    """Dictionary-encoded values: integer codes into a list of distinct values in first-seen order."""
+
+    def __init__(self, codes: np.ndarray, dictionary: list[Any], buffer: np.ndarray | None = None, lookup: dict[Any, int] | None = None):
+        self.codes = codes
+        self.dictionary = dictionary
+        self._buffer = codes if buffer is None else buffer
+        # Built on the first append, so opening a stored table does not hash its whole dictionary
+        self._lookup = lookup
+        # (dictionary entries parsed, epoch day, has-date flag); None once a value that is not a date is seen
+        self._days: tuple[int, np.ndarray, np.ndarray] | None = (0, np.empty(0, dtype=np.int64), np.empty(0, dtype=bool))
+
+    @classmethod
+    def encode(cls, values: list[Any]) -> "DimensionColumn":
+        return cls(np.empty(0, dtype=np.int32), []).appended(values)
+
+    def appended(self, values: list[Any]) -> "DimensionColumn":
+        """A column with values added at the end. The dictionary only grows, so it is shared with this column."""
+        size = len(self.codes)
+        buffer = reserve(self._buffer, size, len(values))
+        buffer[size:size + len(values)] = self._encode(values)
+        column = DimensionColumn(buffer[:size + len(values)], self.dictionary, buffer, self._lookup)
+        column._days = self._days
+        return column
+
+    def _encode(self, values: list[Any]) -> np.ndarray:
+        if self._lookup is None:
+            self._lookup = {value: code for code, value in enumerate(self.dictionary)}
+        lookup, dictionary = self._lookup, self.dictionary
+        codes = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = lookup.get(value)
+            if code is None:
+                code = lookup[value] = len(dictionary)
+                dictionary.append(value)
+            codes[i] = code
+        return codes
+
+    def labels(self) -> list[str]:
+        return ["Unknown" if v is None else str(v) for v in self.dictionary]
+
+    def numeric_values(self) -> np.ndarray:
+        lookup = np.array([v if isinstance(v, NUMERIC_TYPES) else np.nan for v in self.dictionary], dtype=np.float64)
+        return lookup[self.codes]
+
+    def day_numbers(self) -> tuple[np.ndarray, np.ndarray] | None:
+        """Epoch day and a has-date flag per dictionary entry, or None when the column is not a date field. Each entry is parsed once."""
+        if self._days is not None and self._days[0] < len(self.dictionary):
+            parsed, day, has_day = self._days
+            added = self.dictionary[parsed:]
+            days = [None if v is None else parse_day(v) for v in added]
+            if any(v is not None and d is None for v, d in zip(added, days)):
+                self._days = None
+            else:
+                self._days = (
+                    parsed + len(added),
+                    np.concatenate([day, np.array([d or 0 for d in days], dtype=np.int64)]),
+                    np.concatenate([has_day, np.array([d is not None for d in days], dtype=bool)]),
+                )
+        if self._days is None or not self._days[2].any():
+            return None
+        return self._days[1], self._days[2]
+
+
+class ColumnarTable:
+    def __init__(self, num_rows: int, columns: dict[str, NumericColumn | DimensionColumn], indexed: bool = True):
+        self.num_rows = num_rows
+        self.columns = columns
+        self.indexed = indexed
+        # Rows [indexed_rows, num_rows) were appended after the indexes were built and are scanned instead
+        self.indexed_rows = 0
+        self.posting_indexes: dict[str, PostingIndex] = {}
+        self.sorted_indexes: dict[str, SortedIndex] = {}
+        if indexed:
+            self.build_indexes()
+
+    @classmethod
+    def from_records(cls, records: list[dict], metrics: Iterable[str], indexed: bool = True) -> "ColumnarTable":
+        fields = list(dict.fromkeys(field for record in records for field in record))
+        return cls.from_columns({field: [r.get(field) for r in records] for field in fields}, metrics, indexed)
+
+    @classmethod
+    def from_columns(cls, columns: dict[str, list[Any]], metrics: Iterable[str], indexed: bool = True) -> "ColumnarTable":
+        metrics = set(metrics)
+        num_rows = len(next(iter(columns.values()), []))
+        encoded = {
+            field: NumericColumn.encode(values) if field in metrics else DimensionColumn.encode(values)
+            for field, values in columns.items()
+        }
+        return cls(num_rows, encoded, indexed)
+
+    def build_indexes(self) -> None:
+        self.posting_indexes, self.sorted_indexes = {}, {}
+        for field, column in self.columns.items():
+            if isinstance(column, DimensionColumn):
+                self.posting_indexes[field] = PostingIndex.build(column.codes, len(column.dictionary))
+            else:
+                self.sorted_indexes[field] = SortedIndex.build(column.values)
+        self.indexed_rows = self.num_rows
+
+    def append(self, records: list[dict], metrics: Iterable[str]) -> "ColumnarTable":
+        """A new table with records added at the end.
+
+        Column buffers are shared and only written past this table's rows, so queries still running against
+        this table are unaffected. Indexes are carried over and the new rows scanned until they are rebuilt.
+        """
+        metrics = set(metrics)
+        fields = list(dict.fromkeys([*self.columns, *(field for record in records for field in record)]))
+        columns: dict[str, NumericColumn | DimensionColumn] = {}
+        for field in fields:
+            column = self.columns.get(field)
+            if column is None:
+                # A field first seen in this batch is missing from every earlier row
+                encode = NumericColumn.encode if field in metrics else DimensionColumn.encode
+                column = encode([None] * self.num_rows)
+            columns[field] = column.appended([r.get(field) for r in records])
+
+        table = ColumnarTable(self.num_rows + len(records), columns, indexed=False)
+        table.indexed = self.indexed
+        if self.indexed and table.num_rows - self.indexed_rows > max(REINDEX_MIN_ROWS, self.indexed_rows * REINDEX_FRACTION):
+            table.build_indexes()
+        elif self.indexed:
+            table.posting_indexes, table.sorted_indexes, table.indexed_rows = self.posting_indexes, self.sorted_indexes, self.indexed_rows
+        return table
+
+    def slice(self, start: int, stop: int) -> "ColumnarTable":
+        """Rows [start, stop) as an unindexed table sharing this table's buffers and dictionaries."""
+        columns: dict[str, NumericColumn | DimensionColumn] = {
+            field: NumericColumn(column.values[start:stop]) if isinstance(column, NumericColumn) else DimensionColumn(column.codes[start:stop], column.dictionary)
+            for field, column in self.columns.items()
+        }
+        return ColumnarTable(stop - start, columns, indexed=False)
+
+    def numeric(self, field: str) -> np.ndarray:
+        column = self.columns.get(field)
+        if isinstance(column, NumericColumn):
+            return column.values
+        if isinstance(column, DimensionColumn):
+            return column.numeric_values()
+        return np.full(self.num_rows, np.nan)
+
+    def dimension(self, field: str) -> DimensionColumn:
+        column = self.columns.get(field)
+        if isinstance(column, DimensionColumn):
+            return column
+        if isinstance(column, NumericColumn):
+            return DimensionColumn.encode([None if np.isnan(v) else int(v) if v.is_integer() else v for v in column.values.tolist()])
+        return DimensionColumn(np.zeros(self.num_rows, dtype=np.int32), [None])
+
+
+class ColumnarDataAdapter(DataAdapter):
+    """Same behaviour as MockDataAdapter, but filters with indexes and boolean masks and aggregates with bincount-style reductions."""
+
+    supports_append = True
+
+    def __init__(
+        self,
+        data: dict[Dataset, list[dict]] | None = None,
+        metadata: dict[Dataset, dict[str, list[str]]] | None = None,
+        indexed: bool = True,
+        tables: dict[Dataset, ColumnarTable] | None = None,
+    ):
+        self.metadata = DATASET_METADATA if metadata is None else metadata
+        if tables is None:
+            data = MOCK_DATA if data is None else data
+            tables = {name: ColumnarTable.from_records(records, self.get_available_metrics(name), indexed) for name, records in data.items()}
+        self.tables = tables
+        self._append_lock = threading.Lock()
+
+    def get_available_datasets(self) -> list[Dataset]:
+        return list(self.tables.keys())
+
+    def get_available_metrics(self, dataset: Dataset) -> list[str]:
+        return self.metadata.get(dataset, {}).get("metrics", [])
+
+    def get_available_dimensions(self, dataset: Dataset) -> list[str]:
+        return self.metadata.get(dataset, {}).get("dimensions", [])
+
+    def execute_query(self, intent: ChartIntent) -> ChartData:
+        table = self.tables.get(intent.dataset)
+        if table is None or table.num_rows == 0:
+            raise ValueError(f"Unknown dataset: {intent.dataset}")
+
+        # Apply filters
+        rows = self._select_rows(table, intent.filters)
+        # Group and aggregate
+        return self._group_and_aggregate(table, rows, intent)
+
+    def append_records(self, dataset: Dataset, records: list[dict]) -> None:
+        """Append a batch of records. Queries already running keep reading the table they started with."""
+        if dataset not in self.tables:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        if not records:
+            return
+        with self._append_lock:
+            self.tables[dataset] = self.tables[dataset].append(records, self.get_available_metrics(dataset))
+
+    def _select_rows(self, table: ColumnarTable, filters: list[Filter] | None) -> np.ndarray | None:
+        """Sorted row ids or a boolean mask matching every filter; None selects all rows."""
+        if not filters:
+            return None
+        rows, residual = self._index_scan(table, filters)
+        if rows is None:
+            mask = np.ones(table.num_rows, dtype=bool)
+            for f in residual:
+                mask &= self._filter_mask(table, f)
+            return mask
+        # Check the remaining filters only against the rows the index produced
+        for f in residual:
+            rows = rows[self._filter_mask(table, f, rows)]
+        return rows
+
+    def _index_scan(self, table: ColumnarTable, filters: list[Filter]) -> tuple[np.ndarray | None, list[Filter]]:
+        best = self._choose_index(table, filters)
+        if best is None:
+            return None, filters
+        lookup, chosen = best
+        return lookup(), [f for f in filters if f is not chosen]
+
+    def _choose_index(self, table: ColumnarTable, filters: list[Filter]) -> tuple[Callable[[], np.ndarray], Filter] | None:
+        """The lookup for the most selective indexed filter, or None when no index narrows the scan enough."""
+        best: tuple[int, Callable[[], np.ndarray], Filter] | None = None
+        for f in filters:
+            candidate = self._index_candidate(table, f)
+            if candidate and (best is None or candidate[0] < best[0]):
+                best = (*candidate, f)
+        if best is None or best[0] > table.num_rows * INDEX_SELECTIVITY:
+            return None
+        return best[1], best[2]
+
+    def _index_candidate(self, table: ColumnarTable, f: Filter) -> tuple[int, Callable[[], np.ndarray]] | None:
+        """Estimated row count and lookup for a filter that an index can answer. Rows appended since the last rebuild are scanned."""
+        column = table.columns.get(f.field)
+        unindexed = table.num_rows - table.indexed_rows
+        if isinstance(column, DimensionColumn) and f.operator in ("eq", "in") and f.field in table.posting_indexes:
+            posting_index = table.posting_indexes[f.field]
+            matches = self._dictionary_matches(column, f)
+            return posting_index.count(matches) + unindexed, lambda: self._with_unindexed(table, posting_index.lookup(matches), f)
+        if isinstance(column, NumericColumn) and f.field in table.sorted_indexes:
+            sorted_index = table.sorted_indexes[f.field]
+            bounds = sorted_index.range(f)
+            if bounds:
+                start, stop = bounds
+                return max(stop - start, 0) + unindexed, lambda: self._with_unindexed(table, sorted_index.lookup(start, stop), f)
+        return None
+
+    def _with_unindexed(self, table: ColumnarTable, rows: np.ndarray, f: Filter) -> np.ndarray:
+        """Add the matching rows the indexes do not cover yet. They all come after the indexed rows, so the result stays sorted."""
+        if table.indexed_rows == table.num_rows:
+            return rows
+        unindexed = np.arange(table.indexed_rows, table.num_rows)
+        return np.concatenate([rows, unindexed[self._filter_mask(table, f, unindexed)]])
+
+    def _filter_mask(self, table: ColumnarTable, f: Filter, rows: np.ndarray | None = None) -> np.ndarray:
+        column = table.columns.get(f.field)
+        if isinstance(column, NumericColumn):
+            return self._numeric_mask(self._select(column.values, rows), f)
+        if isinstance(column, DimensionColumn):
+            # Evaluate the filter once per distinct value, then gather by code
+            return self._dictionary_matches(column, f)[self._select(column.codes, rows)]
+        return np.full(table.num_rows if rows is None else len(rows), compile_value_predicate(f)(None))
+
+    def _dictionary_matches(self, column: DimensionColumn, f: Filter) -> np.ndarray:
+        test = compile_value_predicate(f)
+        return np.fromiter((test(v) for v in column.dictionary), dtype=bool, count=len(column.dictionary))
+
+    def _numeric_mask(self, values: np.ndarray, f: Filter) -> np.ndarray:
+        with np.errstate(invalid="ignore"):
+            if f.operator in ("eq", "neq"):
+                match = values == f.value if isinstance(f.value, NUMERIC_TYPES) else np.zeros(len(values), dtype=bool)
+                return match if f.operator == "eq" else ~match
+            if f.operator == "between":
+                low, high = between_bounds(f)
+                return (values >= low) & (values <= high)
+            if f.operator in ("gt", "gte", "lt", "lte") and not isinstance(f.value, NUMERIC_TYPES):
+                return np.zeros(len(values), dtype=bool)
+            if f.operator == "gt":
+                return values > f.value
+            if f.operator == "gte":
+                return values >= f.value
+            if f.operator == "lt":
+                return values < f.value
+            if f.operator == "lte":
+                return values <= f.value
+            if f.operator == "in":
+                options = [v for v in f.value if isinstance(v, NUMERIC_TYPES)] if isinstance(f.value, list) else []
+                return np.isin(values, options)
+        raise ValueError(f"Unsupported filter operator: {f.operator}")
+
+    def _group_and_aggregate(self, table: ColumnarTable, rows: np.ndarray | None, intent: ChartIntent) -> ChartData:
+        dimension = intent.dimensions[0] if intent.dimensions else None
+        split = intent.dimensions[1] if intent.dimensions and len(intent.dimensions) > 1 else None
+        metrics = intent.metrics
+
+        if not dimension:
+            values = [self._aggregate_total(self._select(table.numeric(m.field), rows), m.aggregation) for m in metrics]
+            return build_totals_chart_data(intent, values)
+
+        column = table.dimension(dimension.field)
+        days = column.day_numbers() if dimension.granularity else None
+        if days is not None:
+            rows, group_ids, labels = self._bucket_groups(table, rows, column, days, dimension.granularity)
+        else:
+            group_ids, labels = self._first_seen_groups(column, self._select(column.codes, rows))
+        rows, group_ids, labels = self._rank_groups(table, rows, intent, group_ids, labels)
+
+        if split:
+            return self._split_and_aggregate(table, rows, intent, group_ids, labels, table.dimension(split.field))
+        series = [
+            self._aggregate_groups(self._select(table.numeric(m.field), rows), group_ids, len(labels), m.aggregation)
+            for m in metrics
+        ]
+        return build_chart_data(intent, labels, series)
+
+    def _rank_groups(
+        self, table: ColumnarTable, rows: np.ndarray | None, intent: ChartIntent, group_ids: np.ndarray, labels: list[str]
+    ) -> tuple[np.ndarray | None, np.ndarray, list[str]]:
+        """Apply the intent's sort, limit and Other bucket: group ids are renumbered in display order and rows of dropped groups removed."""
+        sort = resolve_sort(intent)
+        limit = int(intent.limit) if intent.limit else None
+        if sort is None and (limit is None or limit >= len(labels)):
+            return rows, group_ids, labels
+        if sort is None or sort[0] == "label":
+            kept = np.array(select_groups(intent, labels), dtype=np.intp)
+        else:
+            metric = intent.metrics[sort[0]]
+            values = self._aggregate_groups(self._select(table.numeric(metric.field), rows), group_ids, len(labels), metric.aggregation)
+            kept = self._top_groups(values, limit, sort[1])
+
+        other = intent.show_other and len(kept) < len(labels)
+        position = np.full(len(labels), len(kept) if other else -1, dtype=np.intp)
+        position[kept] = np.arange(len(kept))
+        group_ids = position[group_ids]
+        if not other and len(kept) < len(labels):
+            keep = group_ids >= 0
+            rows, group_ids = self._row_ids(table, rows)[keep], group_ids[keep]
+        return rows, group_ids, [labels[i] for i in kept.tolist()] + ([OTHER_LABEL] if other else [])
+
+    def _top_groups(self, values: np.ndarray, limit: int | None, descending: bool) -> np.ndarray:
+        """Positions of the limit largest (or smallest) values in order, ties in original order, like select_groups.
+
+        argpartition finds the cut-off in O(groups), so only the groups that make the cut are sorted.
+        """
+        keys = -values if descending else values
+        candidates = np.arange(len(keys))
+        if limit is not None and limit < len(keys):
+            cutoff = keys[np.argpartition(keys, limit - 1)[limit - 1]]
+            # Keep every group tied with the cut-off so the stable sort below decides ties by position
+            candidates = np.flatnonzero(keys <= cutoff)
+        return candidates[np.argsort(keys[candidates], kind="stable")][:limit]
+
+    def _first_seen_groups(self, column: DimensionColumn, codes: np.ndarray) -> tuple[np.ndarray, list[str]]:
+        """Group id per selected row and the group labels, numbering groups by first appearance like MockDataAdapter."""
+        present, first_index = np.unique(codes, return_index=True)
+        present = present[np.argsort(first_index, kind="stable")]
+        position = np.empty(len(column.dictionary), dtype=np.intp)
+        position[present] = np.arange(len(present))
+        dictionary_labels = column.labels()
+        return position[codes], [dictionary_labels[code] for code in present.tolist()]
+
+    def _bucket_groups(
+        self, table: ColumnarTable, rows: np.ndarray | None, column: DimensionColumn, days: tuple[np.ndarray, np.ndarray], granularity: Granularity
+    ) -> tuple[np.ndarray | None, np.ndarray, list[str]]:
+        """Group a date dimension into calendar buckets. Bucketing runs over the dictionary, so each distinct date is converted once."""
+        day_of_code, has_day = days
+        bucket_of_code = bucket_ids(day_of_code, granularity)
+        codes = self._select(column.codes, rows)
+        # Rows without a date have no place on a time axis
+        dated = has_day[codes]
+        if not dated.all():
+            rows = self._row_ids(table, rows)[dated]
+            codes = codes[dated]
+
+        present_codes = np.flatnonzero(np.bincount(codes, minlength=len(column.dictionary)))
+        buckets = bucket_range(np.unique(bucket_of_code[present_codes]))
+        return rows, np.searchsorted(buckets, bucket_of_code[codes]), bucket_labels(buckets, granularity)
+
+    def _split_and_aggregate(
+        self, table: ColumnarTable, rows: np.ndarray | None, intent: ChartIntent, group_ids: np.ndarray, labels: list[str], column: DimensionColumn
+    ) -> ChartData:
+        """One series per value of the second dimension, aggregated on a composite (label, series) id in a single reduction per metric."""
+        series_ids, series_labels = self._first_seen_groups(column, self._select(column.codes, rows))
+        first_metric = self._select(table.numeric(intent.metrics[0].field), rows)
+        sizes = np.bincount(series_ids[~np.isnan(first_metric)], minlength=len(series_labels))
+        kept = top_series(sizes.tolist())
+        if len(kept) < len(series_labels):
+            position = np.full(len(series_labels), -1, dtype=np.intp)
+            position[kept] = np.arange(len(kept))
+            series_ids = position[series_ids]
+            keep = series_ids >= 0
+            rows, group_ids, series_ids = self._row_ids(table, rows)[keep], group_ids[keep], series_ids[keep]
+            series_labels = [series_labels[i] for i in kept]
+
+        # Series-major ids, so each series' values are one contiguous row of the result
+        composite_ids = series_ids * len(labels) + group_ids
+        by_metric = [
+            self._aggregate_groups(self._select(table.numeric(m.field), rows), composite_ids, len(series_labels) * len(labels), m.aggregation).reshape(len(series_labels), len(labels))
+            for m in intent.metrics
+        ]
+        series = [[values[i] for values in by_metric] for i in range(len(series_labels))]
+        return build_series_chart_data(intent, labels, series_labels, series)
+
+    def _row_ids(self, table: ColumnarTable, rows: np.ndarray | None) -> np.ndarray:
+        """Selected rows as an array of row ids, whether given as None (all rows), a boolean mask or row ids."""
+        if rows is None:
+            return np.arange(table.num_rows)
+        return np.flatnonzero(rows) if rows.dtype == bool else rows
+
+    def _select(self, values: np.ndarray, rows: np.ndarray | None) -> np.ndarray:
+        return values if rows is None else values[rows]
+
+    def _aggregate_groups(self, values: np.ndarray, group_ids: np.ndarray, num_groups: int, aggregation: str) -> np.ndarray:
+        valid = ~np.isnan(values)
+        ids, values = group_ids[valid], values[valid]
+        counts = np.bincount(ids, minlength=num_groups).astype(np.float64)
+        if aggregation == "count":
+            return counts
+        if aggregation in ("min", "max"):
+            reducer = np.minimum if aggregation == "min" else np.maximum
+            result = np.full(num_groups, np.inf if aggregation == "min" else -np.inf)
+            reducer.at(result, ids, values)
+            return np.where(counts > 0, result, 0.0)
+        sums = np.bincount(ids, weights=values, minlength=num_groups)
+        if aggregation == "avg":
+            return np.divide(sums, counts, out=np.zeros(num_groups), where=counts > 0)
+        return sums
+
+    def _aggregate_total(self, values: np.ndarray, aggregation: str) -> float:
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return 0.0
+        if aggregation == "avg":
+            return float(values.mean())
+        if aggregation == "min":
+            return float(values.min())
+        if aggregation == "max":
+            return float(values.max())
+        if aggregation == "count":
+            return float(len(values))
+        return float(values.sum())
@@ -0,0 +1,80 @@
+"""Server-side downsampling of long line, area and scatter series."""
+
+import numpy as np
+
+from .types import ChartData, ChartDataset, ChartType
+
+# Most points sent per chart type; other chart types are never downsampled
+DOWNSAMPLE_TARGETS: dict[ChartType, int] = {"line": 1000, "area": 1000, "scatter": 2000}
+
+
+def parse_targets(spec: str) -> dict[ChartType, int]:
+    """Targets from "line=1000,area=1000,scatter=2000". Unlisted chart types keep their default, 0 disables one."""
+    targets = dict(DOWNSAMPLE_TARGETS)
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        chart_type, _, points = item.partition("=")
+        targets[chart_type.strip()] = int(points)
+    return targets
+
+
+def lttb_indices(series: np.ndarray, target: int) -> np.ndarray:
+    """Indices of the points to keep, chosen with Largest-Triangle-Three-Buckets over one or more series sharing an x-axis.
+
+    series has one row per dataset. The first and last points are always kept and one point is picked per bucket in between:
+    the one forming the largest triangle with the neighbouring buckets' averages (summed over datasets, each scaled by its range).
+    Using the previous bucket's average instead of the previously picked point makes every bucket independent, so the whole
+    selection is a handful of vectorized passes. NaN values are gaps: they are left out of the averages and ranges, and a
+    point that is NaN in every dataset is only picked when its whole bucket is.
+    """
+    num_points = series.shape[1]
+    if target >= num_points or target < 3:
+        return np.arange(num_points) if target >= num_points else np.array([0, num_points - 1])[:max(target, 0)]
+
+    x = np.arange(num_points, dtype=np.float64)
+    # Bucket b covers [edges[b], edges[b + 1]); the first and last points are buckets of their own
+    edges = np.concatenate([[0], np.linspace(1, num_points - 1, target - 1).astype(np.int64), [num_points]])
+    sizes = np.diff(edges)
+    x_mean = np.add.reduceat(x, edges[:-1]) / sizes
+    valid = ~np.isnan(series)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # NaN for a bucket with no values in a dataset
+        y_mean = np.add.reduceat(np.where(valid, series, 0), edges[:-1], axis=1) / np.add.reduceat(valid, edges[:-1], axis=1)
+
+    # Previous and next bucket average for every point of the inner buckets
+    bucket = np.repeat(np.arange(len(sizes)), sizes)[1:-1]
+    inner = np.arange(1, num_points - 1)
+    xa, xc = x_mean[bucket - 1], x_mean[bucket + 1]
+    ya, yc = y_mean[:, bucket - 1], y_mean[:, bucket + 1]
+    scale = np.fmax.reduce(series, axis=1, keepdims=True) - np.fmin.reduce(series, axis=1, keepdims=True)
+    scale[~(scale > 0)] = 1
+    # A dataset with a gap at the point or in a neighbouring bucket adds nothing to that point's area
+    area = np.nan_to_num(np.abs((xa - xc) * (series[:, inner] - ya) - (xa - x[inner]) * (yc - ya)) / scale).sum(axis=0)
+    area[~valid[:, inner].any(axis=0)] = -1
+
+    # First point of every inner bucket reaching the bucket's largest area
+    largest = np.maximum.reduceat(area, edges[1:-2] - 1)
+    candidates = np.flatnonzero(area == largest[bucket - 1])
+    _, first = np.unique(bucket[candidates], return_index=True)
+    return np.concatenate([[0], inner[candidates[first]], [num_points - 1]])
+
+
+def downsample(data: ChartData, chart_type: ChartType, targets: dict[ChartType, int] | None = None) -> ChartData:
+    """Reduce a chart to at most the target number of points for its type, keeping its visual shape. Short charts are returned as is."""
+    target = (DOWNSAMPLE_TARGETS if targets is None else targets).get(chart_type, 0)
+    if not target or len(data.labels) <= target or not data.datasets:
+        return data
+    keep = lttb_indices(np.array([ds.data for ds in data.datasets], dtype=np.float64), target)
+    positions = keep.tolist()
+    return ChartData(
+        labels=[data.labels[i] for i in positions],
+        datasets=[
+            ChartDataset(
+                label=ds.label,
+                data=ds.data[keep] if isinstance(ds.data, np.ndarray) else np.asarray(ds.data, dtype=np.float64)[keep].tolist(),
+                background_color=ds.background_color,
+                border_color=ds.border_color,
+                border_width=ds.border_width,
+            )
+            for ds in data.datasets
+        ],
+    )
@@ -0,0 +1,61 @@
+"""Compile intent filters into specialised predicates."""
+
+from typing import Any, Callable
+
+from .aggregation import NUMERIC_TYPES
+from .types import Filter
+
+ValuePredicate = Callable[[Any], bool]
+RecordPredicate = Callable[[dict], bool]
+
+
+def between_bounds(f: Filter) -> tuple[int | float, int | float]:
+    if not (isinstance(f.value, list) and len(f.value) == 2 and all(isinstance(v, NUMERIC_TYPES) for v in f.value)):
+        raise ValueError(f"Filter 'between' on {f.field} requires a [low, high] numeric value")
+    low, high = f.value
+    return low, high
+
+
+def compile_value_predicate(f: Filter) -> ValuePredicate:
+    """Resolve the operator once and return a predicate over a single field value."""
+    target = f.value
+    if f.operator == "eq":
+        return lambda value: value == target
+    if f.operator == "neq":
+        return lambda value: value != target
+    if f.operator == "gt":
+        return lambda value: isinstance(value, NUMERIC_TYPES) and value > target
+    if f.operator == "gte":
+        return lambda value: isinstance(value, NUMERIC_TYPES) and value >= target
+    if f.operator == "lt":
+        return lambda value: isinstance(value, NUMERIC_TYPES) and value < target
+    if f.operator == "lte":
+        return lambda value: isinstance(value, NUMERIC_TYPES) and value <= target
+    if f.operator == "in":
+        if not isinstance(target, list):
+            return lambda value: False
+        try:
+            options = frozenset(target)
+        except TypeError:
+            options = target
+        return lambda value: value in options
+    if f.operator == "between":
+        low, high = between_bounds(f)
+        return lambda value: isinstance(value, NUMERIC_TYPES) and low <= value <= high
+    raise ValueError(f"Unsupported filter operator: {f.operator}")
+
+
+def compile_filters(filters: list[Filter] | None) -> RecordPredicate | None:
+    """Combine all filters of an intent into a single record predicate, or None when there is nothing to filter."""
+    if not filters:
+        return None
+    predicate: RecordPredicate | None = None
+    for f in filters:
+        predicate = _record_predicate(f.field, compile_value_predicate(f), predicate)
+    return predicate
+
+
+def _record_predicate(field: str, test: ValuePredicate, previous: RecordPredicate | None) -> RecordPredicate:
+    if previous is None:
+        return lambda record: test(record.get(field))
+    return lambda record: previous(record) and test(record.get(field))
@@ -1,11 +1,22 @@
 """Intent resolver - orchestrates LLM and data adapter."""
 
+import asyncio
+import hashlib
+import json
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any
+from typing import Any, AsyncIterator, Iterator
 
 from .adapters import DataAdapter
+from .cache import intent_cache_key, normalize_prompt
+from .downsample import downsample
 from .llm import LLMProvider, IntentContext
-from .types import ChartIntent, ChartResponse, ChartSpec, Granularity
+from .singleflight import SingleFlight
+from .types import ChartIntent, ChartData, ChartResponse, ChartSpec, ChartType, Granularity, chart_spec_to_dict, chart_data_to_dict
 
 GRANULARITY_MAP: dict[str, Granularity] = {
     "daily": "day", "weekly": "week", "monthly": "month",
@@ -13,44 +24,180 @@ GRANULARITY_MAP: dict[str, Granularity] = {
     "day": "day", "week": "week", "month": "month", "quarter": "quarter", "year": "year",
 }
 
+CHART_TYPES = ["bar", "line", "pie", "doughnut", "area", "scatter"]
+
+# Default number of prompts of a batch resolved at the same time
+BATCH_CONCURRENCY = 8
+
+# Seconds before re-reading the catalog of adapters that do not report a catalog version
+CATALOG_TTL = 60.0
+
+
+@dataclass
+class CatalogSnapshot:
+    datasets: dict[str, dict[str, list[str]]]
+    version: str  # content hash of datasets and chart types
+    adapter_version: str | None
+    built_at: float
+
 
 class IntentResolver:
-    def __init__(self, llm_provider: LLMProvider, data_adapter: DataAdapter):
+    def __init__(self, llm_provider: LLMProvider, data_adapter: DataAdapter, downsample_targets: dict[ChartType, int] | None = None):
         self.llm = llm_provider
         self.adapter = data_adapter
+        self.downsample_targets = downsample_targets
+        self._catalog: CatalogSnapshot | None = None
+        self._catalog_lock = threading.Lock()
+        # Identical prompts resolved concurrently share one LLM call and one query
+        self.inflight = SingleFlight()
+
+    def refresh_catalog(self) -> None:
+        """Drop the catalog snapshot so the next request re-reads datasets, metrics and dimensions."""
+        self._catalog = None
 
     def resolve(self, prompt: str, additional_context: dict[str, Any] | None = None) -> ChartResponse:
-        # Build context for LLM
-        datasets = {
-            ds: {"metrics": self.adapter.get_available_metrics(ds), "dimensions": self.adapter.get_available_dimensions(ds)}
-            for ds in self.adapter.get_available_datasets()
-        }
+        return self._resolve_shared(prompt, self._build_context(additional_context))
 
-        context = IntentContext(
-            datasets=datasets,
-            available_chart_types=["bar", "line", "pie", "doughnut", "area", "scatter"],
-            additional_context=additional_context,
-        )
+    async def aresolve(self, prompt: str, additional_context: dict[str, Any] | None = None) -> ChartResponse:
+        # Catalog lookups may hit a database, so keep them off the event loop
+        return await self._aresolve_shared(prompt, await asyncio.to_thread(self._build_context, additional_context))
 
+    def resolve_batch(
+        self, prompts: list[str], additional_context: dict[str, Any] | None = None, max_concurrency: int = BATCH_CONCURRENCY
+    ) -> list[ChartResponse | Exception]:
+        """Resolve many prompts with one shared context, running each distinct prompt once on a bounded thread pool."""
+        context = self._build_context(additional_context)
+        unique = self._unique_prompts(prompts)
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(unique)))) as executor:
+            futures = {key: executor.submit(self._resolve_shared, prompt, context) for key, prompt in unique.items()}
+        results = {key: future.exception() or future.result() for key, future in futures.items()}
+        return [results[normalize_prompt(prompt)] for prompt in prompts]
+
+    async def aresolve_batch(
+        self, prompts: list[str], additional_context: dict[str, Any] | None = None, max_concurrency: int = BATCH_CONCURRENCY
+    ) -> list[ChartResponse | Exception]:
+        """Async resolve_batch: distinct prompts fan out concurrently, at most max_concurrency at a time."""
+        context = await asyncio.to_thread(self._build_context, additional_context)
+        unique = self._unique_prompts(prompts)
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run(prompt: str) -> ChartResponse:
+            async with semaphore:
+                return await self._aresolve_shared(prompt, context)
+
+        resolved = await asyncio.gather(*(run(prompt) for prompt in unique.values()), return_exceptions=True)
+        results = dict(zip(unique.keys(), resolved))
+        return [results[normalize_prompt(prompt)] for prompt in prompts]
+
+    def stream(self, prompt: str, additional_context: dict[str, Any] | None = None) -> Iterator[tuple[str, dict]]:
+        """Yield (event, payload) pairs: LLM progress, then the chart spec as soon as the intent is parsed, then the data."""
+        context = self._build_context(additional_context)
+        events: queue.SimpleQueue = queue.SimpleQueue()
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.llm.stream_intent, prompt, context, events.put)
+            future.add_done_callback(lambda _: events.put(None))
+            while (received := events.get()) is not None:
+                yield "progress", {"characters": received}
+            intent = future.result().intent
+
+        self._normalize_intent(intent)
+        yield "spec", {"chartSpec": chart_spec_to_dict(self._build_chart_spec(intent))}
+        data = downsample(self.adapter.execute_query(intent), intent.chart_type, self.downsample_targets)
+        yield "data", {"data": chart_data_to_dict(data), "metadata": self._build_metadata(intent, data)}
+
+    async def astream(self, prompt: str, additional_context: dict[str, Any] | None = None) -> AsyncIterator[tuple[str, dict]]:
+        """Async stream: same events, without blocking the event loop."""
+        context = await asyncio.to_thread(self._build_context, additional_context)
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        # Providers may report progress from a worker thread
+        task = asyncio.create_task(self.llm.astream_intent(prompt, context, lambda received: loop.call_soon_threadsafe(events.put_nowait, received)))
+        task.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (received := await events.get()) is not None:
+                yield "progress", {"characters": received}
+            intent = task.result().intent
+        finally:
+            task.cancel()
+
+        self._normalize_intent(intent)
+        yield "spec", {"chartSpec": chart_spec_to_dict(self._build_chart_spec(intent))}
+        data = downsample(await self.adapter.aexecute_query(intent), intent.chart_type, self.downsample_targets)
+        yield "data", {"data": chart_data_to_dict(data), "metadata": self._build_metadata(intent, data)}
+
+    def _resolve_shared(self, prompt: str, context: IntentContext) -> ChartResponse:
+        """Resolve, joining a resolution of the same prompt and context already in flight. Callers share the response object."""
+        return self.inflight.do(intent_cache_key(prompt, context), lambda: self._resolve(prompt, context))
+
+    async def _aresolve_shared(self, prompt: str, context: IntentContext) -> ChartResponse:
+        return await self.inflight.ado(intent_cache_key(prompt, context), lambda: self._aresolve(prompt, context))
+
+    def _resolve(self, prompt: str, context: IntentContext) -> ChartResponse:
         # Generate and normalize intent
         result = self.llm.generate_intent(prompt, context)
         intent = result.intent
         self._normalize_intent(intent)
 
         # Execute query
-        data = self.adapter.execute_query(intent)
-
-        # Build response
-        return ChartResponse(
-            chart_spec=self._build_chart_spec(intent),
-            data=data,
-            metadata={
-                "generatedAt": datetime.now(timezone.utc).isoformat(),
-                "dataset": intent.dataset,
-                "recordCount": len(data.labels),
-            },
+        data = downsample(self.adapter.execute_query(intent), intent.chart_type, self.downsample_targets)
+        return self._build_response(intent, data)
+
+    async def _aresolve(self, prompt: str, context: IntentContext) -> ChartResponse:
+        # Generate and normalize intent
+        result = await self.llm.agenerate_intent(prompt, context)
+        intent = result.intent
+        self._normalize_intent(intent)
+
+        # Execute query
+        data = downsample(await self.adapter.aexecute_query(intent), intent.chart_type, self.downsample_targets)
+        return self._build_response(intent, data)
+
+    def _unique_prompts(self, prompts: list[str]) -> dict[str, str]:
+        unique: dict[str, str] = {}
+        for prompt in prompts:
+            unique.setdefault(normalize_prompt(prompt), prompt)
+        return unique
+
+    def _build_context(self, additional_context: dict[str, Any] | None) -> IntentContext:
+        catalog = self._get_catalog()
+        return IntentContext(
+            datasets=catalog.datasets,
+            available_chart_types=CHART_TYPES,
+            additional_context=additional_context,
+            version=catalog.version,
         )
 
+    def _get_catalog(self) -> CatalogSnapshot:
+        adapter_version = self.adapter.get_catalog_version()
+        catalog = self._catalog
+        if catalog is not None and not self._catalog_stale(catalog, adapter_version):
+            return catalog
+        with self._catalog_lock:
+            if self._catalog is not None and not self._catalog_stale(self._catalog, adapter_version):
+                return self._catalog
+            datasets = {
+                ds: {"metrics": self.adapter.get_available_metrics(ds), "dimensions": self.adapter.get_available_dimensions(ds)}
+                for ds in self.adapter.get_available_datasets()
+            }
+            version = hashlib.sha256(json.dumps([datasets, CHART_TYPES]).encode()).hexdigest()[:16]
+            self._catalog = CatalogSnapshot(datasets, version, adapter_version, time.monotonic())
+            return self._catalog
+
+    def _catalog_stale(self, catalog: CatalogSnapshot, adapter_version: str | None) -> bool:
+        if adapter_version is not None:
+            return adapter_version != catalog.adapter_version
+        return time.monotonic() - catalog.built_at > CATALOG_TTL
+
+    def _build_response(self, intent: ChartIntent, data: ChartData) -> ChartResponse:
+        return ChartResponse(chart_spec=self._build_chart_spec(intent), data=data, metadata=self._build_metadata(intent, data))
+
+    def _build_metadata(self, intent: ChartIntent, data: ChartData) -> dict:
+        return {
+            "generatedAt": datetime.now(timezone.utc).isoformat(),
+            "dataset": intent.dataset,
+            "recordCount": len(data.labels),
+        }
+
     def _normalize_intent(self, intent: ChartIntent) -> None:
         if intent.dimensions:
             for dim in intent.dimensions:
@@ -67,5 +214,5 @@ class IntentResolver:
             title=intent.title or f"{metric_label} by {dimension.field if dimension else 'value'}",
             x_axis={"label": dimension.field, "type": "category"} if dimension else None,
             y_axis={"label": metric_label, "type": "linear"},
-            legend={"position": "top", "display": len(intent.metrics) > 1 or intent.chart_type in ("pie", "doughnut")},
+            legend={"position": "top", "display": len(intent.metrics) > 1 or len(intent.dimensions or []) > 1 or intent.chart_type in ("pie", "doughnut")},
         )
@@ -0,0 +1,189 @@
+"""Keyword-based intent parser that answers simple prompts without calling the LLM."""
+
+import re
+import threading
+
+from .intent_resolver import GRANULARITY_MAP
+from .llm import LLMProvider, IntentContext, IntentResult, ProgressCallback
+from .types import ChartIntent, ChartType, Dimension, Granularity, Metric
+
+# Parses at or above this confidence are used; anything less goes to the fallback provider.
+# 1.0 means every word that is not filler was understood: an unknown word may be a filter value ("for north")
+FAST_PATH_CONFIDENCE = 1.0
+
+AGGREGATION_WORDS = {
+    "sum": "sum", "total": "sum",
+    "average": "avg", "avg": "avg", "mean": "avg",
+    "min": "min", "minimum": "min", "lowest": "min",
+    "max": "max", "maximum": "max", "highest": "max", "peak": "max",
+    "count": "count",
+}
+CHART_WORDS: dict[str, ChartType] = {
+    "bar": "bar", "bars": "bar", "column": "bar", "columns": "bar",
+    "line": "line", "lines": "line", "trend": "line",
+    "pie": "pie", "doughnut": "doughnut", "donut": "doughnut",
+    "area": "area", "scatter": "scatter",
+}
+# Words that carry no meaning of their own in prompts like "show me total revenue by region as a pie chart"
+FILLER_WORDS = {
+    "show", "me", "give", "get", "display", "draw", "plot", "chart", "graph", "please", "the", "a", "an", "of", "by", "per",
+    "for", "each", "as", "and", "split", "broken", "down", "across", "breakdown", "distribution", "compare", "our", "my", "what",
+    "is", "are", "with", "in", "to", "all",
+}
+# Words that usually introduce a filter, which this parser leaves to the LLM
+FILTER_WORDS = {
+    "where", "only", "excluding", "except", "without", "not", "greater", "less", "more", "than", "above", "below", "between",
+    "since", "after", "before", "last", "this", "over", "under", "during",
+}
+# Date fields a bare granularity word ("weekly revenue") is applied to when the dataset has no field named after it
+DATE_FIELDS = ("date", "day", "timestamp", "time", "createdAt", "created_at")
+
+
+class KeywordIntentProvider(LLMProvider):
+    """Maps simple prompts to intents from the catalog vocabulary and passes the rest to another provider.
+
+    A prompt is parsed against each dataset: metric and dimension names (camelCase split into words, plurals
+    accepted), aggregation and chart type words, granularity words from GRANULARITY_MAP and "top/bottom N".
+    The dataset matching the most fields wins. Confidence is the share of the prompt's words, filler words left out,
+    the parse explains. It is 0 when the dataset is ambiguous, no metric is named or a filter is implied. hits and fallbacks count
+    how often the fast path answered.
+    """
+
+    def __init__(self, fallback: LLMProvider | None = None, min_confidence: float = FAST_PATH_CONFIDENCE):
+        self.fallback = fallback
+        self.min_confidence = min_confidence
+        self.hits = 0
+        self.fallbacks = 0
+        self._lock = threading.Lock()
+
+    def generate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
+        return self._local(prompt, context) or self._fallback().generate_intent(prompt, context)
+
+    async def agenerate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
+        return self._local(prompt, context) or await self._fallback().agenerate_intent(prompt, context)
+
+    def stream_intent(self, prompt: str, context: IntentContext, on_progress: ProgressCallback) -> IntentResult:
+        return self._local(prompt, context) or self._fallback().stream_intent(prompt, context, on_progress)
+
+    async def astream_intent(self, prompt: str, context: IntentContext, on_progress: ProgressCallback) -> IntentResult:
+        return self._local(prompt, context) or await self._fallback().astream_intent(prompt, context, on_progress)
+
+    def parse(self, prompt: str, context: IntentContext) -> tuple[ChartIntent | None, float]:
+        """The best intent for the prompt and its confidence between 0 and 1."""
+        words = re.findall(r"[a-z0-9]+", prompt.casefold())
+        meaningful = sum(word not in FILLER_WORDS for word in words)
+        if not meaningful or FILTER_WORDS.intersection(words):
+            return None, 0.0
+        candidates = [self._parse_dataset(words, name, meta, context.available_chart_types) for name, meta in context.datasets.items()]
+        candidates = [c for c in candidates if c is not None]
+        if not candidates:
+            return None, 0.0
+        candidates.sort(key=lambda c: c[0], reverse=True)
+        if len(candidates) > 1 and candidates[1][0] == candidates[0][0]:
+            return None, 0.0
+        _, intent, explained = candidates[0]
+        return intent, explained / meaningful
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "fallbacks": self.fallbacks}
+
+    def _local(self, prompt: str, context: IntentContext) -> IntentResult | None:
+        intent, confidence = self.parse(prompt, context)
+        hit = intent is not None and confidence >= self.min_confidence
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.fallbacks += 1
+        return IntentResult(intent=intent) if hit else None
+
+    def _fallback(self) -> LLMProvider:
+        if self.fallback is None:
+            raise ValueError("Prompt is not simple enough to parse without an LLM")
+        return self.fallback
+
+    def _parse_dataset(self, words: list[str], dataset: str, meta: dict[str, list[str]], chart_types: list[str]) -> tuple[int, ChartIntent, int] | None:
+        """(score, intent, non-filler words explained) for the prompt read against one dataset, or None when it names no metric of it."""
+        phrases = {**_phrases(meta.get("dimensions", []), "dimension"), **_phrases(meta.get("metrics", []), "metric")}
+        longest = max((len(phrase) for phrase in phrases), default=1)
+        metrics: list[Metric] = []
+        dimensions: list[Dimension] = []
+        chart_type: ChartType | None = None
+        aggregation = granularity = limit = descending = None
+        mentioned = explained = i = 0
+        while i < len(words):
+            match = next(((n, phrases[tuple(words[i:i + n])]) for n in range(min(longest, len(words) - i), 0, -1) if tuple(words[i:i + n]) in phrases), None)
+            word = words[i]
+            if match:
+                n, (kind, field) = match
+                if kind == "metric":
+                    metrics.append(Metric(field=field, aggregation=aggregation or "sum"))
+                    aggregation = None
+                elif all(d.field != field for d in dimensions):
+                    dimensions.append(Dimension(field=field))
+                # A word naming the dataset as well as a field ("products" in the products dataset) counts for both
+                mentioned |= word in (dataset.casefold(), dataset.casefold().rstrip("s"))
+                explained += sum(w not in FILLER_WORDS for w in words[i:i + n])
+                i += n
+                continue
+            if word in (dataset.casefold(), dataset.casefold().rstrip("s")):
+                mentioned = 1
+            elif word in AGGREGATION_WORDS:
+                aggregation = AGGREGATION_WORDS[word]
+            elif word in CHART_WORDS and CHART_WORDS[word] in chart_types:
+                chart_type = CHART_WORDS[word]
+            elif word in GRANULARITY_MAP:
+                granularity = GRANULARITY_MAP[word]
+            elif word in ("top", "bottom") and i + 1 < len(words) and words[i + 1].isdigit():
+                limit, descending = int(words[i + 1]), word == "top"
+                explained += 1
+                i += 1
+            else:
+                # Filler words are not counted; any other word is left unexplained
+                i += 1
+                continue
+            explained += 1
+            i += 1
+
+        if not metrics or len(dimensions) > 2 or (granularity and not self._apply_granularity(dimensions, granularity, meta)):
+            return None
+        intent = ChartIntent(
+            dataset=dataset,
+            metrics=metrics,
+            chart_type=chart_type or ("line" if dimensions and _is_time(dimensions[0]) else "bar"),
+            dimensions=dimensions or None,
+            sort_by="value" if limit else None,
+            sort_order=("desc" if descending else "asc") if limit else None,
+            limit=limit,
+        )
+        return len(metrics) + len(dimensions) + mentioned, intent, explained
+
+    def _apply_granularity(self, dimensions: list[Dimension], granularity: Granularity, meta: dict[str, list[str]]) -> bool:
+        """Group by the field named after the granularity, or bucket the dataset's date field. False when there is neither."""
+        available = meta.get("dimensions", [])
+        if granularity in available:
+            if all(d.field != granularity for d in dimensions):
+                dimensions.insert(0, Dimension(field=granularity))
+            return True
+        date_field = next((f for f in DATE_FIELDS if f in available), None)
+        if date_field is None:
+            return False
+        dimensions[:] = [d for d in dimensions if d.field != date_field]
+        dimensions.insert(0, Dimension(field=date_field, granularity=granularity))
+        return True
+
+
+def _phrases(fields: list[str], kind: str) -> dict[tuple[str, ...], tuple[str, str]]:
+    """Word sequences naming each field: "activeUsers" is matched by "active users", "activeusers" and their plurals."""
+    phrases = {}
+    for field in fields:
+        words = [w.casefold() for w in re.findall(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])", field)] or [field.casefold()]
+        for variant in (words, ["".join(words)]):
+            phrases[tuple(variant)] = (kind, field)
+            plural = variant[-1][:-1] + "ies" if variant[-1].endswith("y") else variant[-1] + "s"
+            phrases[tuple(variant[:-1] + [plural])] = (kind, field)
+    return phrases
+
+
+def _is_time(dimension: Dimension) -> bool:
+    return dimension.granularity is not None or dimension.field in GRANULARITY_MAP or dimension.field in DATE_FIELDS
@@ -0,0 +1,192 @@
+"""Multi-process aggregation over a memory-mapped dataset store."""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .adapters import build_grouped_chart_data, build_totals_chart_data, rank_groups
+from .aggregation import Accumulator, GroupAggregator
+from .columnar import ColumnarDataAdapter, ColumnarTable, DimensionColumn
+from .store import read_store
+from .timebuckets import bucket_ids, bucket_labels, bucket_range
+from .types import ChartData, ChartIntent
+
+# Scans of tables with fewer stored rows than this stay in the calling process
+PARALLEL_MIN_ROWS = 1_000_000
+
+# Partial aggregation of one chunk: composite (group code, series code) key, first matching row per key,
+# and count/sum/min/max states shaped (4, fields, keys)
+PartialStates = tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# Adapter over the store opened once in each worker process (see _init_worker)
+_worker_adapter: "ParallelColumnarDataAdapter | None" = None
+
+
+class ParallelColumnarDataAdapter(ColumnarDataAdapter):
+    """Columnar adapter over a store that aggregates large scans in a process pool.
+
+    The stored rows are split into one chunk per worker. Workers open the store themselves, so they read the chunks
+    from the shared page cache instead of receiving them pickled. Each worker filters its chunk and returns
+    sum/count/min/max states per (group, series) code pair; the states are merged here and ranked like rollup groups.
+    Rows appended since the store was opened are aggregated in this process as one more chunk. Intents that an index
+    answers, small tables and grouping on a numeric field run single-process as in ColumnarDataAdapter.
+    """
+
+    def __init__(self, directory: str | Path, workers: int | None = None, min_rows: int = PARALLEL_MIN_ROWS):
+        tables, metadata = read_store(directory)
+        super().__init__(metadata=metadata, tables=tables)
+        self.directory = str(directory)
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.min_rows = min_rows
+        # Rows held in the store's files; rows after them were appended in this process
+        self.stored_rows = {name: table.num_rows for name, table in tables.items()}
+        self._executor: ProcessPoolExecutor | None = None
+        self._executor_lock = threading.Lock()
+
+    def execute_query(self, intent: ChartIntent) -> ChartData:
+        table = self.tables.get(intent.dataset)
+        if table is None or table.num_rows == 0 or not self._parallel(table, intent):
+            return super().execute_query(intent)
+
+        dimensions = (intent.dimensions or [])[:2]
+        split_cardinality = len(table.dimension(dimensions[1].field).dictionary) if len(dimensions) > 1 else 1
+        stored = self.stored_rows[intent.dataset]
+        bounds = np.linspace(0, stored, self.workers + 1).astype(np.int64).tolist()
+        executor = self._get_executor()
+        futures = [
+            executor.submit(_scan_chunk, intent.dataset, start, stop, intent, split_cardinality)
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+        partials = [self._partial_states(table, stored, table.num_rows, intent, split_cardinality)] if table.num_rows > stored else []
+        return self._merge_and_group(table, intent, [future.result() for future in futures] + partials, split_cardinality)
+
+    def close(self) -> None:
+        """Shut down the worker processes."""
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+
+    def _parallel(self, table: ColumnarTable, intent: ChartIntent) -> bool:
+        if self.workers < 2 or self.stored_rows.get(intent.dataset, 0) < self.min_rows:
+            return False
+        # Numeric fields are dictionary-encoded per query, so their codes would differ between workers
+        if not all(isinstance(table.columns.get(d.field), DimensionColumn) for d in (intent.dimensions or [])[:2]):
+            return False
+        # A selective index lookup touches few rows and is cheaper than fanning out
+        return self._choose_index(table, intent.filters or []) is None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                # spawn, not fork: forking a threaded server process can deadlock the child
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.directory,),
+                )
+            return self._executor
+
+    def _partial_states(self, table: ColumnarTable, start: int, stop: int, intent: ChartIntent, split_cardinality: int) -> PartialStates:
+        """Filter rows [start, stop) and aggregate every metric field per (group, series) code pair."""
+        chunk = table.slice(start, stop)
+        rows = self._select_rows(chunk, intent.filters)
+        dimensions = (intent.dimensions or [])[:2]
+        keys = np.zeros(chunk.num_rows, dtype=np.int64)
+        if dimensions:
+            keys += chunk.dimension(dimensions[0].field).codes.astype(np.int64) * split_cardinality
+        if len(dimensions) > 1:
+            keys += chunk.dimension(dimensions[1].field).codes
+        unique, first, inverse = np.unique(self._select(keys, rows), return_index=True, return_inverse=True)
+
+        fields = _fields(intent)
+        states = _empty_states(len(fields), len(unique))
+        for i, field in enumerate(fields):
+            values = self._select(chunk.numeric(field), rows)
+            valid = ~np.isnan(values)
+            ids, values = inverse[valid], values[valid]
+            states[0, i] = np.bincount(ids, minlength=len(unique))
+            states[1, i] = np.bincount(ids, weights=values, minlength=len(unique))
+            aggregations = {m.aggregation for m in intent.metrics if m.field == field}
+            if "min" in aggregations:
+                np.minimum.at(states[2, i], ids, values)
+            if "max" in aggregations:
+                np.maximum.at(states[3, i], ids, values)
+        return unique, self._row_ids(chunk, rows)[first] + start, states
+
+    def _merge_and_group(self, table: ColumnarTable, intent: ChartIntent, partials: list[PartialStates], split_cardinality: int) -> ChartData:
+        """Merge chunk states by key, then label, rank and build the chart from them as from rollup groups."""
+        keys, inverse = np.unique(np.concatenate([p[0] for p in partials]), return_inverse=True)
+        first = np.full(len(keys), np.iinfo(np.int64).max)
+        np.minimum.at(first, inverse, np.concatenate([p[1] for p in partials]))
+        chunk_states = np.concatenate([p[2] for p in partials], axis=2)
+        fields = _fields(intent)
+        states = _empty_states(len(fields), len(keys))
+        for i in range(len(fields)):
+            states[0, i] = np.bincount(inverse, weights=chunk_states[0, i], minlength=len(keys))
+            states[1, i] = np.bincount(inverse, weights=chunk_states[1, i], minlength=len(keys))
+            np.minimum.at(states[2, i], inverse, chunk_states[2, i])
+            np.maximum.at(states[3, i], inverse, chunk_states[3, i])
+
+        # Keys in order of their first row, so groups and series keep first-seen order as in a single scan
+        order = np.argsort(first, kind="stable")
+        group_codes, series_codes = np.divmod(keys[order], split_cardinality)
+        dimensions = (intent.dimensions or [])[:2]
+        labels: list[str] = []
+        group_labels: list[str | None] = [None] * len(order)
+        if dimensions:
+            column = table.dimension(dimensions[0].field)
+            days = column.day_numbers() if dimensions[0].granularity else None
+            if days is not None:
+                # Rows without a date have no place on a time axis
+                day_of_code, has_day = days
+                dated = has_day[group_codes]
+                order, group_codes, series_codes = order[dated], group_codes[dated], series_codes[dated]
+                bucket_of_key = bucket_ids(day_of_code, dimensions[0].granularity)[group_codes]
+                buckets = bucket_range(np.unique(bucket_of_key))
+                labels = bucket_labels(buckets, dimensions[0].granularity)
+                group_labels = [labels[i] for i in np.searchsorted(buckets, bucket_of_key).tolist()]
+            else:
+                dictionary_labels = column.labels()
+                group_labels = [dictionary_labels[code] for code in group_codes.tolist()]
+                labels = list(dict.fromkeys(group_labels))
+        series_labels: list[str | None] = [None] * len(order)
+        if len(dimensions) > 1:
+            dictionary_labels = table.dimension(dimensions[1].field).labels()
+            series_labels = [dictionary_labels[code] for code in series_codes.tolist()]
+
+        aggregator = GroupAggregator(fields)
+        for position, label, series in zip(order.tolist(), group_labels, series_labels):
+            accumulators = aggregator.groups.setdefault((label, series), [Accumulator() for _ in fields])
+            for i, accumulator in enumerate(accumulators):
+                accumulator.merge(Accumulator.from_state(*states[:, i, position].tolist()))
+
+        field_index = [fields.index(m.field) for m in intent.metrics]
+        if not dimensions:
+            return build_totals_chart_data(intent, [aggregator.result((None, None), f, m.aggregation) for f, m in zip(field_index, intent.metrics)])
+        labels, aggregator = rank_groups(intent, aggregator, labels, field_index)
+        return build_grouped_chart_data(intent, aggregator, labels, field_index)
+
+
+def _fields(intent: ChartIntent) -> list[str]:
+    return list(dict.fromkeys(m.field for m in intent.metrics))
+
+
+def _empty_states(num_fields: int, num_keys: int) -> np.ndarray:
+    states = np.zeros((4, num_fields, num_keys))
+    states[2], states[3] = np.inf, -np.inf
+    return states
+
+
+def _init_worker(directory: str) -> None:
+    global _worker_adapter
+    _worker_adapter = ParallelColumnarDataAdapter(directory, workers=1)
+
+
+def _scan_chunk(dataset: str, start: int, stop: int, intent: ChartIntent, split_cardinality: int) -> PartialStates:
+    return _worker_adapter._partial_states(_worker_adapter.tables[dataset], start, stop, intent, split_cardinality)
@@ -1,11 +1,23 @@
 """API routes for PromptChart."""
 
-from fastapi import APIRouter, HTTPException
+import asyncio
+import hmac
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel
 from typing import Any
 
+from .adapters import AppendNotSupportedError, DataAdapter
+from .arrow import ARROW_STREAM, accepts_arrow, response_to_arrow
+from .ingest import append_stream, read_csv, read_jsonl
 from .intent_resolver import IntentResolver
-from .types import response_to_dict
+from .llm import LLMUnavailableError
+from .serialization import compress, dumps
+from .types import ChartResponse, response_to_dict, sse_event
+
+# Maximum number of prompts accepted by the batch endpoint
+MAX_BATCH_SIZE = 50
 
 
 class ChartRequest(BaseModel):
@@ -13,16 +25,104 @@ class ChartRequest(BaseModel):
     context: dict[str, Any] | None = None
 
 
+class BatchChartRequest(BaseModel):
+    prompts: list[str]
+    context: dict[str, Any] | None = None
+
+
+def error_status(error: Exception) -> tuple[int, str]:
+    """HTTP status and error code for a failed chart request."""
+    if isinstance(error, LLMUnavailableError):
+        return 503, "LLM_UNAVAILABLE"
+    return 500, "INTERNAL_ERROR"
+
+
+def ingest_error_status(error: Exception) -> tuple[int, str]:
+    """HTTP status and error code for a failed ingest request."""
+    if isinstance(error, AppendNotSupportedError):
+        return 405, "APPEND_NOT_SUPPORTED"
+    if isinstance(error, (ValueError, UnicodeDecodeError)):
+        return 400, "INVALID_REQUEST"
+    return 500, "INTERNAL_ERROR"
+
+
+def authorized(header: str | None, token: str) -> bool:
+    """Whether an Authorization header carries the bearer token (compared in constant time)."""
+    scheme, _, value = (header or "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(value.strip().encode(), token.encode())
+
+
+def batch_item_to_dict(result: ChartResponse | Exception) -> dict:
+    if isinstance(result, Exception):
+        print(f"Chart generation error: {result}")
+        return {"error": str(result), "code": error_status(result)[1]}
+    return response_to_dict(result)
+
+
+def json_response(payload: dict, http_request: Request) -> Response:
+    """Encode the payload straight to (optionally compressed) bytes, bypassing FastAPI's response validation and encoder."""
+    body, encoding = compress(dumps(payload), http_request.headers.get("accept-encoding"))
+    headers = {"Vary": "Accept, Accept-Encoding", **({"Content-Encoding": encoding} if encoding else {})}
+    return Response(body, media_type="application/json", headers=headers)
+
+
 def create_chart_router(resolver: IntentResolver) -> APIRouter:
     router = APIRouter()
 
     @router.post("/")
-    async def generate_chart(request: ChartRequest):
+    async def generate_chart(request: ChartRequest, http_request: Request):
         try:
-            result = resolver.resolve(request.prompt, request.context)
-            return response_to_dict(result)
+            result = await resolver.aresolve(request.prompt, request.context)
+            if accepts_arrow(http_request.headers.get("accept")):
+                return Response(response_to_arrow(result), media_type=ARROW_STREAM, headers={"Vary": "Accept, Accept-Encoding"})
+            return json_response(response_to_dict(result), http_request)
         except Exception as e:
             print(f"Chart generation error: {e}")
-            raise HTTPException(status_code=500, detail={"error": str(e), "code": "INTERNAL_ERROR"})
+            status, code = error_status(e)
+            raise HTTPException(status_code=status, detail={"error": str(e), "code": code})
+
+    @router.post("/stream")
+    async def stream_chart(request: ChartRequest):
+        async def events():
+            try:
+                async for event, payload in resolver.astream(request.prompt, request.context):
+                    yield sse_event(event, payload)
+            except Exception as e:
+                print(f"Chart generation error: {e}")
+                yield sse_event("error", {"error": str(e), "code": error_status(e)[1]})
+
+        return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @router.post("/batch")
+    async def generate_charts(request: BatchChartRequest, http_request: Request):
+        if not request.prompts or len(request.prompts) > MAX_BATCH_SIZE:
+            raise HTTPException(status_code=400, detail={"error": f"Expected 1 to {MAX_BATCH_SIZE} prompts", "code": "INVALID_REQUEST"})
+        results = await resolver.aresolve_batch(request.prompts, request.context)
+        return json_response({"results": [batch_item_to_dict(result) for result in results]}, http_request)
+
+    return router
+
+
+def create_ingest_router(adapter: DataAdapter, token: str) -> APIRouter:
+    """Routes writing records into the adapter. Every request must send "Authorization: Bearer <token>"."""
+    router = APIRouter()
+
+    @router.post("/{dataset}/records")
+    async def append_records(dataset: str, http_request: Request):
+        """Append a JSONL body (or CSV with a header row when sent as text/csv) to a dataset."""
+        if not authorized(http_request.headers.get("authorization"), token):
+            raise HTTPException(status_code=401, detail={"error": "Missing or invalid ingest token", "code": "UNAUTHORIZED"})
+        if dataset not in adapter.get_available_datasets():
+            raise HTTPException(status_code=404, detail={"error": f"Unknown dataset: {dataset}", "code": "UNKNOWN_DATASET"})
+        try:
+            lines = (await http_request.body()).decode().splitlines()
+            is_csv = http_request.headers.get("content-type", "").startswith("text/csv")
+            records = read_csv(lines, adapter.get_available_metrics(dataset)) if is_csv else read_jsonl(lines)
+            appended = await asyncio.to_thread(append_stream, adapter, dataset, records)
+        except Exception as e:
+            print(f"Ingest error: {e}")
+            status, code = ingest_error_status(e)
+            raise HTTPException(status_code=status, detail={"error": str(e), "code": code})
+        return {"appended": appended}
 
     return router
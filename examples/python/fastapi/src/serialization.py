@@ -0,0 +1,44 @@
+"""Fast JSON encoding and compression of response bodies."""
+
+import gzip
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # optional: falls back to the standard library encoder
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip is offered without it
+    brotli = None
+
+# Bodies smaller than this are sent uncompressed; compressing them costs more time than it saves
+COMPRESS_MIN_BYTES = 1024
+
+
+def dumps(payload: Any) -> bytes:
+    """Compact JSON bytes, encoded by orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(payload, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(payload, separators=(",", ":"), default=_to_builtin).encode()
+
+
+def _to_builtin(value: Any) -> Any:
+    # NumPy arrays and scalars (e.g. chart values from the columnar adapter)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def compress(body: bytes, accept_encoding: str | None, min_bytes: int = COMPRESS_MIN_BYTES) -> tuple[bytes, str | None]:
+    """Compress a body with the best encoding the client accepts (brotli, then gzip). Returns the body and its Content-Encoding."""
+    if len(body) < min_bytes or not accept_encoding:
+        return body, None
+    accepted = {token.split(";")[0].strip().lower() for token in accept_encoding.split(",")}
+    if brotli is not None and "br" in accepted:
+        return brotli.compress(body, quality=4), "br"
+    if "gzip" in accepted:
+        return gzip.compress(body, compresslevel=5), "gzip"
+    return body, None
@@ -0,0 +1,69 @@
+"""Coalescing of identical concurrent calls (single-flight)."""
+
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Runs at most one call per key at a time. Callers arriving while it runs wait for it and share its result or exception.
+
+    Nothing is kept once a call finishes, so this only merges overlapping calls; repeated calls are left to the caches.
+    do() serves threads (Flask, batch pools) and ado() coroutines on an event loop (FastAPI).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, Future] = {}
+        self._tasks: dict[tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> T:
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            self._count(leader)
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            task = self._tasks.get((loop, key))
+            leader = task is None
+            if leader:
+                task = self._tasks[(loop, key)] = loop.create_task(fn())
+                task.add_done_callback(lambda _: self._forget(loop, key))
+            self._count(leader)
+        # Shielded, so one caller giving up (e.g. a client disconnecting) does not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "coalesced": self.coalesced}
+
+    def _count(self, leader: bool) -> None:
+        if leader:
+            self.calls += 1
+        else:
+            self.coalesced += 1
+
+    def _forget(self, loop: asyncio.AbstractEventLoop, key: Hashable) -> None:
+        with self._lock:
+            self._tasks.pop((loop, key), None)
@@ -0,0 +1,325 @@
+"""SQL data adapter that pushes intents down to the database."""
+
+import queue
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator
+
+from .adapters import DataAdapter, DATASET_METADATA, build_chart_data, build_grouped_chart_data, build_totals_chart_data, rank_groups, resolve_sort
+from .aggregation import Accumulator, GroupAggregator
+from .filters import between_bounds
+from .types import ChartIntent, ChartData, Dataset, Filter, Granularity
+
+AGGREGATE_FUNCTIONS = {"sum": "SUM", "avg": "AVG", "min": "MIN", "max": "MAX", "count": "COUNT"}
+
+
+class ConnectionPool:
+    """Fixed-size pool of DB-API connections, opened lazily and reused across queries and threads."""
+
+    def __init__(self, connect: Callable[[], Any], size: int = 4):
+        self._connect = connect
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        with self._slots:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class SQLDataAdapter(DataAdapter):
+    """Translates each ChartIntent into one parameterized GROUP BY query executed by the database."""
+
+    placeholder = "?"
+    supports_append = True
+
+    def __init__(self, pool: ConnectionPool, metadata: dict[Dataset, dict[str, list[str]]] | None = None, tables: dict[Dataset, str] | None = None):
+        self.pool = pool
+        self.metadata = DATASET_METADATA if metadata is None else metadata
+        self.tables = tables or {}
+        # (dataset, field) -> whether all its values are dates; dropped for a dataset when records are appended to it
+        self._date_fields: dict[tuple[Dataset, str], bool] = {}
+
+    def get_available_datasets(self) -> list[Dataset]:
+        return list(self.metadata.keys())
+
+    def get_available_metrics(self, dataset: Dataset) -> list[str]:
+        return self.metadata.get(dataset, {}).get("metrics", [])
+
+    def get_available_dimensions(self, dataset: Dataset) -> list[str]:
+        return self.metadata.get(dataset, {}).get("dimensions", [])
+
+    def execute_query(self, intent: ChartIntent) -> ChartData:
+        sql, params = self.compile(intent)
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql, params)
+                rows = cursor.fetchall()
+            finally:
+                cursor.close()
+
+        if not intent.dimensions:
+            return build_totals_chart_data(intent, [float(v or 0) for v in rows[0]] if rows else [0.0] * len(intent.metrics))
+        if self._ranks_states(intent):
+            return self._rank_states(intent, rows)
+        labels = ["Unknown" if row[0] is None else str(row[0]) for row in rows]
+        series = [[float(row[i + 1] or 0) for row in rows] for i in range(len(intent.metrics))]
+        return build_chart_data(intent, labels, series)
+
+    def _rank_states(self, intent: ChartIntent, rows: list[tuple]) -> ChartData:
+        """Rank (label[, series], count/sum/min/max per field...) rows and build the chart like the in-memory adapters.
+
+        Labels are sorted and limited on their totals across every series, the rest are merged into Other when the
+        intent asks for it, and the largest series are picked among the kept labels.
+        """
+        fields = _fields(intent)
+        keys = 2 if len(intent.dimensions) > 1 else 1
+        aggregator = GroupAggregator(fields)
+        for row in rows:
+            label, series = ("Unknown" if v is None else str(v) for v in row[:2]) if keys == 2 else ("Unknown" if row[0] is None else str(row[0]), None)
+            accumulators = aggregator.groups.setdefault((label, series), [Accumulator() for _ in fields])
+            for i, accumulator in enumerate(accumulators):
+                accumulator.merge(Accumulator.from_state(*row[keys + 4 * i:keys + 4 * i + 4]))
+        labels = list(dict.fromkeys(label for label, _ in aggregator.groups))
+        if self._bucketed(intent):
+            # Rows come in first-seen order so series keep it; bucket labels sort chronologically
+            labels.sort()
+        field_index = [fields.index(m.field) for m in intent.metrics]
+        labels, aggregator = rank_groups(intent, aggregator, labels, field_index)
+        return build_grouped_chart_data(intent, aggregator, labels, field_index)
+
+    def append_records(self, dataset: Dataset, records: list[dict[str, Any]]) -> None:
+        """Insert a batch of records in one transaction. Only catalog fields may be written."""
+        if dataset not in self.metadata:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        fields = list(dict.fromkeys(field for record in records for field in record))
+        if not fields:
+            return
+        columns = ", ".join(self._column(field, dataset) for field in fields)
+        sql = f"INSERT INTO {self.quote(self.tables.get(dataset, dataset))} ({columns}) VALUES ({', '.join([self.placeholder] * len(fields))})"
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.executemany(sql, [tuple(record.get(field) for field in fields) for record in records])
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                cursor.close()
+        for key in [key for key in self._date_fields if key[0] == dataset]:
+            self._date_fields.pop(key, None)
+
+    def compile(self, intent: ChartIntent) -> tuple[str, list[Any]]:
+        """Build the SQL text and its parameters. Values are always bound, so equally shaped intents share one prepared statement."""
+        if intent.dataset not in self.metadata:
+            raise ValueError(f"Unknown dataset: {intent.dataset}")
+        dimension = intent.dimensions[0] if intent.dimensions else None
+        split = intent.dimensions[1] if intent.dimensions and len(intent.dimensions) > 1 else None
+        params: list[Any] = []
+
+        columns = [self._aggregate_sql(m.field, m.aggregation, intent.dataset) for m in intent.metrics]
+        if dimension:
+            column = self._column(dimension.field, intent.dataset)
+            columns.insert(0, self.bucket_sql(column, dimension.granularity) if self._bucketed(intent) else column)
+        if dimension and self._ranks_states(intent):
+            # One row per label (or label and series) holding count/sum/min/max per field, so labels can be ranked on
+            # their totals and the rest merged into Other
+            keys = [columns[0], self._column(split.field, intent.dataset)] if split else [columns[0]]
+            columns = [*keys, *self._state_sql(intent)]
+        sql = f"SELECT {', '.join(columns)} FROM {self.quote(self.tables.get(intent.dataset, intent.dataset))}"
+
+        if intent.filters:
+            sql += " WHERE " + " AND ".join(self._filter_sql(f, intent.dataset, params) for f in intent.filters)
+        if not dimension:
+            return sql, params
+
+        if self._ranks_states(intent):
+            # Sort, limit and Other apply to label totals, so they are left to _rank_states
+            group_by = ", ".join(keys)
+            sql += f" GROUP BY {group_by}"
+            if self._bucketed(intent):
+                sql += f" HAVING {columns[0]} IS NOT NULL"
+            return sql + f" ORDER BY {self.first_seen_order(group_by)}", params
+
+        sql += f" GROUP BY {columns[0]}"
+        sort = resolve_sort(intent)
+        if sort is None and columns[0] != self.quote(dimension.field):
+            # Time buckets are listed chronologically
+            sql += f" HAVING {columns[0]} IS NOT NULL ORDER BY {columns[0]}"
+        elif sort is None:
+            sql += f" ORDER BY {self.first_seen_order(columns[0])}"
+        else:
+            key, descending = sort
+            sql += f" ORDER BY {columns[0] if key == 'label' else columns[key + 1]} {'DESC' if descending else 'ASC'}"
+            if key != "label":
+                # Ties keep first-seen order, like the in-memory adapters
+                sql += f", {self.first_seen_order(columns[0])}"
+        if intent.limit:
+            sql += f" LIMIT {self.placeholder}"
+            params.append(int(intent.limit))
+        return sql, params
+
+    def first_seen_order(self, dimension_sql: str) -> str:
+        """ORDER BY expression for groups when the intent does not ask for a sort."""
+        return dimension_sql
+
+    def bucket_sql(self, column: str, granularity: Granularity) -> str:
+        """Expression truncating a date column to its calendar bucket label. Date functions are dialect specific."""
+        return column
+
+    def date_sql(self, column: str) -> str | None:
+        """Predicate true for values of column that bucket_sql can truncate. None when the dialect cannot tell (all values are taken as dates)."""
+        return None
+
+    def quote(self, identifier: str) -> str:
+        return '"' + identifier.replace('"', '""') + '"'
+
+    def _column(self, field: str, dataset: Dataset) -> str:
+        # Identifiers cannot be bound as parameters, so only catalog fields are allowed into the SQL text
+        meta = self.metadata[dataset]
+        if field not in meta.get("metrics", []) and field not in meta.get("dimensions", []):
+            raise ValueError(f"Unknown field for {dataset}: {field}")
+        return self.quote(field)
+
+    def _state_sql(self, intent: ChartIntent) -> list[str]:
+        columns = []
+        for field in _fields(intent):
+            column = self._column(field, intent.dataset)
+            columns += [f"COUNT({column})", f"SUM({column})", f"MIN({column})", f"MAX({column})"]
+        return columns
+
+    def _ranks_states(self, intent: ChartIntent) -> bool:
+        """Whether groups are ranked here rather than with ORDER BY/LIMIT: split charts, and limited charts with an Other group."""
+        return len(intent.dimensions or []) > 1 or bool(intent.show_other and intent.limit)
+
+    def _bucketed(self, intent: ChartIntent) -> bool:
+        """Whether the first dimension is grouped on calendar buckets (chronological labels) rather than raw values."""
+        dimension = intent.dimensions[0]
+        column = self._column(dimension.field, intent.dataset)
+        if not dimension.granularity or self.bucket_sql(column, dimension.granularity) == column:
+            return False
+        return self._is_date_field(intent.dataset, dimension.field)
+
+    def _is_date_field(self, dataset: Dataset, field: str) -> bool:
+        """Whether every value of the field is a date, so it is bucketed; like the in-memory adapters, other fields keep their values."""
+        key = (dataset, field)
+        cached = self._date_fields.get(key)
+        if cached is not None:
+            return cached
+        column = self._column(field, dataset)
+        predicate = self.date_sql(column)
+        if predicate is None:
+            return True
+        sql = f"SELECT COUNT({column}), COALESCE(SUM(CASE WHEN {predicate} THEN 1 ELSE 0 END), 0) FROM {self.quote(self.tables.get(dataset, dataset))}"
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(sql)
+                values, dates = cursor.fetchone()
+            finally:
+                cursor.close()
+        self._date_fields[key] = is_date = values > 0 and dates == values
+        return is_date
+
+    def _aggregate_sql(self, field: str, aggregation: str, dataset: Dataset) -> str:
+        function = AGGREGATE_FUNCTIONS.get(aggregation, "SUM")
+        return f"COALESCE({function}({self._column(field, dataset)}), 0)"
+
+    def _filter_sql(self, f: Filter, dataset: Dataset, params: list[Any]) -> str:
+        column = self._column(f.field, dataset)
+        p = self.placeholder
+        if f.operator == "between":
+            params.extend(between_bounds(f))
+            return f"{column} BETWEEN {p} AND {p}"
+        if f.operator == "in":
+            if not isinstance(f.value, list) or not f.value:
+                return "1 = 0"
+            params.extend(f.value)
+            return f"{column} IN ({', '.join([p] * len(f.value))})"
+        comparisons = {"eq": "=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+        params.append(f.value)
+        if f.operator == "neq":
+            return f"({column} <> {p} OR {column} IS NULL)"
+        if f.operator in comparisons:
+            return f"{column} {comparisons[f.operator]} {p}"
+        raise ValueError(f"Unsupported filter operator: {f.operator}")
+
+
+def _fields(intent: ChartIntent) -> list[str]:
+    return list(dict.fromkeys(m.field for m in intent.metrics))
+
+
+class SQLiteDataAdapter(SQLDataAdapter):
+    """SQLDataAdapter over SQLite: the local reference backend."""
+
+    def __init__(
+        self,
+        path: str,
+        metadata: dict[Dataset, dict[str, list[str]]] | None = None,
+        tables: dict[Dataset, str] | None = None,
+        pool_size: int = 4,
+        cached_statements: int = 256,
+    ):
+        uri = path.startswith("file:")
+        # sqlite3 keeps a per-connection cache of prepared statements keyed on the SQL text
+        super().__init__(
+            ConnectionPool(lambda: sqlite3.connect(path, uri=uri, check_same_thread=False, cached_statements=cached_statements), pool_size),
+            metadata,
+            tables,
+        )
+
+    @classmethod
+    def from_records(cls, data: dict[Dataset, list[dict]], metadata: dict[Dataset, dict[str, list[str]]] | None = None, **kwargs: Any) -> "SQLiteDataAdapter":
+        """Load records into a shared in-memory database (handy for local development and tests)."""
+        # The in-memory database lives as long as one pooled connection stays open
+        adapter = cls(f"file:promptchart-{uuid.uuid4().hex}?mode=memory&cache=shared", metadata, **kwargs)
+        with adapter.pool.connection() as conn, conn:
+            for dataset, records in data.items():
+                fields = list(dict.fromkeys(field for record in records for field in record))
+                if not fields:
+                    continue
+                table = adapter.quote(adapter.tables.get(dataset, dataset))
+                conn.execute(f"CREATE TABLE {table} ({', '.join(adapter.quote(f) for f in fields)})")
+                conn.executemany(
+                    f"INSERT INTO {table} VALUES ({', '.join(['?'] * len(fields))})",
+                    [tuple(record.get(f) for f in fields) for record in records],
+                )
+        return adapter
+
+    def bucket_sql(self, column: str, granularity: Granularity) -> str:
+        # Same labels as timebuckets.bucket_labels; weeks are labelled by their Monday
+        if granularity == "day":
+            return f"date({column})"
+        if granularity == "week":
+            return f"date({column}, '-6 days', 'weekday 1')"
+        if granularity == "month":
+            return f"strftime('%Y-%m', {column})"
+        if granularity == "quarter":
+            return f"strftime('%Y', {column}) || '-Q' || ((CAST(strftime('%m', {column}) AS INTEGER) + 2) / 3)"
+        return f"strftime('%Y', {column})"
+
+    def date_sql(self, column: str) -> str:
+        # ISO-8601 text, as timebuckets.parse_day accepts; SQLite would read numbers as Julian days
+        return f"(typeof({column}) = 'text' AND {column} GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*' AND date({column}) IS NOT NULL)"
+
+    def first_seen_order(self, dimension_sql: str) -> str:
+        # Match the in-memory adapters, which list groups in order of first appearance
+        return "MIN(rowid)"
@@ -0,0 +1,123 @@
+"""On-disk columnar dataset store, opened with mmap.
+
+Each dataset is a directory holding a schema.json header and one raw little-endian file per column and index array.
+Files are memory-mapped read-only, so opening a store reads only the headers, workers serving the same store share
+its pages through the OS page cache, and datasets larger than RAM are paged in as queries touch them.
+"""
+
+import json
+import os
+import shutil
+import sys
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from .adapters import MOCK_DATA, DATASET_METADATA
+from .columnar import ColumnarDataAdapter, ColumnarTable, DimensionColumn, NumericColumn
+from .indexes import PostingIndex, SortedIndex
+from .types import Dataset
+
+# Bumped when the file layout changes; stores written with another version are rejected
+STORE_VERSION = 1
+SCHEMA_FILE = "schema.json"
+# Fixed byte order, so a store can be copied between machines
+FLOAT64, INT32, INT64 = np.dtype("<f8"), np.dtype("<i4"), np.dtype("<i8")
+
+
+def write_table(path: str | Path, table: ColumnarTable, metadata: dict[str, Any]) -> None:
+    """Write a table and its indexes to the directory path, replacing any previous contents."""
+    path = Path(path)
+    staging = path.with_name(path.name + ".tmp")
+    shutil.rmtree(staging, ignore_errors=True)
+    staging.mkdir(parents=True)
+    if not table.indexed or table.indexed_rows < table.num_rows:
+        table.build_indexes()
+
+    columns = []
+    for position, (field, column) in enumerate(table.columns.items()):
+        if isinstance(column, NumericColumn):
+            index = table.sorted_indexes[field]
+            entry = {"name": field, "kind": "numeric", "values": _write(staging, f"{position}.values", column.values, FLOAT64)}
+            entry["index"] = {"rows": _write(staging, f"{position}.rows", index.rows, INT64), "values": _write(staging, f"{position}.sorted", index.values, FLOAT64)}
+        else:
+            index = table.posting_indexes[field]
+            entry = {"name": field, "kind": "dimension", "codes": _write(staging, f"{position}.codes", column.codes, INT32), "dictionary": column.dictionary}
+            entry["index"] = {"rows": _write(staging, f"{position}.rows", index.rows, INT64), "offsets": _write(staging, f"{position}.offsets", index.offsets, INT64)}
+        columns.append(entry)
+
+    schema = {
+        "version": STORE_VERSION,
+        "numRows": table.num_rows,
+        "metrics": metadata.get("metrics", []),
+        "dimensions": metadata.get("dimensions", []),
+        "columns": columns,
+    }
+    # Dictionary values JSON cannot hold (e.g. dates) are stored as strings, which is how they are labelled anyway
+    (staging / SCHEMA_FILE).write_text(json.dumps(schema, default=str))
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(staging, path)
+
+
+def read_table(path: str | Path) -> tuple[ColumnarTable, dict[str, Any]]:
+    """Open a table written by write_table. Returns the table and its dataset metadata (metrics and dimensions)."""
+    path = Path(path)
+    schema = json.loads((path / SCHEMA_FILE).read_text())
+    if schema.get("version") != STORE_VERSION:
+        raise ValueError(f"Unsupported store version {schema.get('version')} in {path}")
+
+    num_rows = schema["numRows"]
+    table = ColumnarTable(num_rows, {}, indexed=False)
+    for entry in schema["columns"]:
+        field, index = entry["name"], entry["index"]
+        if entry["kind"] == "numeric":
+            table.columns[field] = NumericColumn(_map(path / entry["values"], FLOAT64, num_rows))
+            table.sorted_indexes[field] = SortedIndex(_map(path / index["rows"], INT64), _map(path / index["values"], FLOAT64))
+        else:
+            table.columns[field] = DimensionColumn(_map(path / entry["codes"], INT32, num_rows), entry["dictionary"])
+            table.posting_indexes[field] = PostingIndex(_map(path / index["rows"], INT64), _map(path / index["offsets"], INT64))
+    table.indexed, table.indexed_rows = True, num_rows
+    return table, {"metrics": schema["metrics"], "dimensions": schema["dimensions"]}
+
+
+def write_store(directory: str | Path, data: dict[Dataset, list[dict]] | None = None, metadata: dict[Dataset, dict[str, Any]] | None = None) -> None:
+    """Write every dataset to a subdirectory of directory, with metrics and dimensions taken from metadata."""
+    data = MOCK_DATA if data is None else data
+    metadata = DATASET_METADATA if metadata is None else metadata
+    for name, records in data.items():
+        meta = metadata.get(name, {})
+        write_table(Path(directory) / name, ColumnarTable.from_records(records, meta.get("metrics", [])), meta)
+
+
+def read_store(directory: str | Path) -> tuple[dict[Dataset, ColumnarTable], dict[Dataset, dict[str, Any]]]:
+    """Open every dataset in a store. Returns the tables and their metadata, both keyed by dataset name."""
+    tables, metadata = {}, {}
+    for path in sorted(Path(directory).iterdir()):
+        if (path / SCHEMA_FILE).is_file():
+            tables[path.name], metadata[path.name] = read_table(path)
+    return tables, metadata
+
+
+def open_store(directory: str | Path) -> ColumnarDataAdapter:
+    """A columnar adapter over every dataset in a store. Appended records are held in memory and are not written back."""
+    tables, metadata = read_store(directory)
+    return ColumnarDataAdapter(metadata=metadata, tables=tables)
+
+
+def _write(directory: Path, name: str, values: np.ndarray, dtype: np.dtype) -> str:
+    np.ascontiguousarray(values, dtype=dtype).tofile(directory / name)
+    return name
+
+
+def _map(path: Path, dtype: np.dtype, length: int | None = None) -> np.ndarray:
+    if (length if length is not None else path.stat().st_size // dtype.itemsize) == 0:
+        # mmap cannot map an empty file
+        return np.empty(0, dtype=dtype)
+    # A plain ndarray view, so results derived from it are ordinary arrays rather than np.memmap
+    return np.memmap(path, dtype=dtype, mode="r", shape=length).view(np.ndarray)
+
+
+if __name__ == "__main__":
+    # python -m src.store <directory>: write the built-in mock datasets as a store
+    write_store(sys.argv[1] if len(sys.argv) > 1 else "data")
@@ -0,0 +1,84 @@
+"""Calendar bucketing of date/time values using integer arithmetic on epoch day numbers."""
+
+import re
+from datetime import date, datetime, timezone
+from typing import Any
+
+import numpy as np
+
+from .types import Granularity
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# Above this many buckets only the non-empty ones are returned
+MAX_FILLED_BUCKETS = 10000
+ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def parse_day(value: Any) -> int | None:
+    """Days since 1970-01-01 for dates, datetimes and ISO-8601 strings. None for anything else (numbers are never dates)."""
+    if isinstance(value, str):
+        if not ISO_DATE.match(value):
+            return None
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.toordinal() - EPOCH_ORDINAL
+    if isinstance(value, date):
+        return value.toordinal() - EPOCH_ORDINAL
+    return None
+
+
+def civil_from_days(days: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Vectorized (year, month, day) from days since the epoch (proleptic Gregorian calendar)."""
+    z = days.astype(np.int64) + 719468
+    era = z // 146097
+    doe = z - era * 146097
+    yoe = (doe - doe // 1460 + doe // 36524 - doe // 146096) // 365
+    doy = doe - (365 * yoe + yoe // 4 - yoe // 100)
+    mp = (5 * doy + 2) // 153
+    day = doy - (153 * mp + 2) // 5 + 1
+    month = np.where(mp < 10, mp + 3, mp - 9)
+    year = yoe + era * 400 + (month <= 2)
+    return year, month, day
+
+
+def bucket_ids(days: np.ndarray, granularity: Granularity) -> np.ndarray:
+    """Consecutive integer ids per bucket, so every bucket between two ids exists and ids sort chronologically."""
+    days = days.astype(np.int64)
+    if granularity == "day":
+        return days
+    if granularity == "week":
+        # 1970-01-01 was a Thursday; weeks start on Monday
+        return (days + 3) // 7
+    year, month, _ = civil_from_days(days)
+    if granularity == "month":
+        return year * 12 + month - 1
+    if granularity == "quarter":
+        return year * 4 + (month - 1) // 3
+    return year
+
+
+def bucket_labels(ids: np.ndarray, granularity: Granularity) -> list[str]:
+    if granularity in ("day", "week"):
+        days = ids * 7 - 3 if granularity == "week" else ids
+        year, month, day = civil_from_days(days)
+        return [f"{y:04d}-{m:02d}-{d:02d}" for y, m, d in zip(year.tolist(), month.tolist(), day.tolist())]
+    if granularity == "month":
+        return [f"{i // 12:04d}-{i % 12 + 1:02d}" for i in ids.tolist()]
+    if granularity == "quarter":
+        return [f"{i // 4:04d}-Q{i % 4 + 1}" for i in ids.tolist()]
+    return [f"{i:04d}" for i in ids.tolist()]
+
+
+def bucket_range(present: np.ndarray) -> np.ndarray:
+    """Every bucket id from the first to the last present one, so empty buckets are filled in order."""
+    if len(present) == 0:
+        return np.empty(0, dtype=np.int64)
+    first, last = int(present.min()), int(present.max())
+    if last - first >= MAX_FILLED_BUCKETS:
+        return np.unique(present)
+    return np.arange(first, last + 1, dtype=np.int64)
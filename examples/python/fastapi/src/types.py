@@ -1,8 +1,12 @@
 """Type definitions for PromptChart."""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from typing import Literal, Any
 
+import numpy as np
+
+from .serialization import dumps
+
 # Type aliases
 Dataset = Literal["sales", "users", "products", "orders", "inventory"]
 Aggregation = Literal["sum", "avg", "min", "max", "count"]
@@ -42,12 +46,13 @@ class ChartIntent:
     sort_by: str | None = None
     sort_order: str | None = None
     limit: int | None = None
+    show_other: bool = False  # merge groups beyond the limit into an "Other" group
 
 
 @dataclass
 class ChartDataset:
     label: str
-    data: list[float]
+    data: list[float] | np.ndarray  # the columnar adapter passes its float64 arrays through without converting them
     background_color: str | list[str] | None = None
     border_color: str | list[str] | None = None
     border_width: int = 1
@@ -75,28 +80,65 @@ class ChartResponse:
     metadata: dict | None = None
 
 
+def chart_spec_to_dict(spec: ChartSpec) -> dict:
+    """Convert ChartSpec to JSON-serializable dict."""
+    return {
+        "type": spec.type,
+        "title": spec.title,
+        "xAxis": spec.x_axis,
+        "yAxis": spec.y_axis,
+        "legend": spec.legend,
+    }
+
+
+def compact_colors(colors: str | list[str] | None) -> str | list[str] | None:
+    """A per-point color list that repeats one color is sent as that color, which Chart.js applies to every point."""
+    if isinstance(colors, list) and colors and colors.count(colors[0]) == len(colors):
+        return colors[0]
+    return colors
+
+
+def chart_data_to_dict(data: ChartData) -> dict:
+    """Convert ChartData to JSON-serializable dict."""
+    return {
+        "labels": data.labels,
+        "datasets": [
+            {
+                "label": ds.label,
+                "data": ds.data,
+                "backgroundColor": compact_colors(ds.background_color),
+                "borderColor": compact_colors(ds.border_color),
+                "borderWidth": ds.border_width,
+            }
+            for ds in data.datasets
+        ],
+    }
+
+
 def response_to_dict(response: ChartResponse) -> dict:
     """Convert ChartResponse to JSON-serializable dict."""
     return {
-        "chartSpec": {
-            "type": response.chart_spec.type,
-            "title": response.chart_spec.title,
-            "xAxis": response.chart_spec.x_axis,
-            "yAxis": response.chart_spec.y_axis,
-            "legend": response.chart_spec.legend,
-        },
-        "data": {
-            "labels": response.data.labels,
-            "datasets": [
-                {
-                    "label": ds.label,
-                    "data": ds.data,
-                    "backgroundColor": ds.background_color,
-                    "borderColor": ds.border_color,
-                    "borderWidth": ds.border_width,
-                }
-                for ds in response.data.datasets
-            ],
-        },
+        "chartSpec": chart_spec_to_dict(response.chart_spec),
+        "data": chart_data_to_dict(response.data),
         "metadata": response.metadata,
     }
+
+
+def sse_event(event: str, payload: dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {dumps(payload).decode()}\n\n"
+
+
+def intent_to_dict(intent: ChartIntent) -> dict:
+    """Convert ChartIntent to a plain dict (snake_case keys) for caching and hashing."""
+    return asdict(intent)
+
+
+def intent_from_dict(data: dict) -> ChartIntent:
+    """Rebuild a ChartIntent from the output of intent_to_dict."""
+    return ChartIntent(**{
+        **data,
+        "metrics": [Metric(**m) for m in data["metrics"]],
+        "dimensions": [Dimension(**d) for d in data["dimensions"]] if data.get("dimensions") is not None else None,
+        "filters": [Filter(**f) for f in data["filters"]] if data.get("filters") is not None else None,
+    })
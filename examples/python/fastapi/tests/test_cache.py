@@ -0,0 +1,163 @@
+"""The intent cache must call the LLM once per distinct prompt and catalog, in memory and across restarts.
+The result cache must serve identical intents until appended records can change them."""
+
+from dataclasses import replace
+
+import pytest
+
+from src.adapters import MockDataAdapter
+from src.cache import CachedDataAdapter, CachedLLMProvider, IntentCache, LRUCache
+from src.llm import IntentContext, IntentResult, LLMProvider
+from src.types import ChartData, ChartIntent, Dimension, Filter, Metric
+
+CONTEXT = IntentContext(datasets={"sales": {"metrics": ["revenue"], "dimensions": ["region"]}}, available_chart_types=["bar"], version="v1")
+
+
+class CountingProvider(LLMProvider):
+    def __init__(self):
+        self.calls = 0
+
+    def generate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
+        self.calls += 1
+        return IntentResult(intent=ChartIntent(dataset="sales", chart_type="bar", metrics=[Metric(field="revenue", aggregation="sum")]), raw_response="{}")
+
+
+class CountingAdapter(MockDataAdapter):
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def execute_query(self, intent: ChartIntent) -> ChartData:
+        self.calls += 1
+        return super().execute_query(intent)
+
+
+def revenue_by_region(*filters: Filter) -> ChartIntent:
+    return ChartIntent(dataset="sales", chart_type="bar", metrics=[Metric(field="revenue", aggregation="sum")], dimensions=[Dimension(field="region")], filters=list(filters) or None)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = LRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    assert cache.stats() == {"hits": 3, "misses": 1, "size": 2}
+
+
+def test_lru_expires_entries_after_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.cache.time.time", lambda: now[0])
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1)
+    now[0] += 10
+    assert cache.get("a") == 1
+    now[0] += 1
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_repeated_prompts_call_the_provider_once():
+    provider = CountingProvider()
+    cached = CachedLLMProvider(provider)
+    first = cached.generate_intent("Revenue by region", CONTEXT)
+    first.intent.title = "changed by the caller"
+    second = cached.generate_intent("  revenue   BY region? ", CONTEXT)
+    assert provider.calls == 1
+    assert second.intent.title is None and second.raw_response == "{}"
+    assert cached.cache.stats()["hits"] == 1
+
+
+def test_catalog_changes_miss_the_cache():
+    provider = CountingProvider()
+    cached = CachedLLMProvider(provider)
+    cached.generate_intent("revenue", CONTEXT)
+    cached.generate_intent("revenue", IntentContext(datasets=CONTEXT.datasets, available_chart_types=["bar"], version="v2"))
+    cached.generate_intent("revenue", IntentContext(datasets=CONTEXT.datasets, available_chart_types=["bar"], version="v1", additional_context={"team": "a"}))
+    assert provider.calls == 3
+
+
+def test_persisted_intents_survive_restarts(tmp_path):
+    path = str(tmp_path / "intents.db")
+    CachedLLMProvider(CountingProvider(), IntentCache(path=path)).generate_intent("revenue", CONTEXT)
+    provider = CountingProvider()
+    restarted = CachedLLMProvider(provider, IntentCache(path=path))
+    restarted.generate_intent("revenue", CONTEXT)
+    restarted.generate_intent("revenue", CONTEXT)
+    assert provider.calls == 0
+    # The disk hit is promoted to memory and counted once as a hit
+    assert restarted.cache.stats() == {"hits": 2, "misses": 0, "size": 1}
+
+
+def test_persisted_intents_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("src.cache.time.time", lambda: now[0])
+    path = str(tmp_path / "intents.db")
+    IntentCache(ttl=60, path=path).set("key", {"intent": None})
+    now[0] += 61
+    assert IntentCache(ttl=60, path=path).get("key") is None
+
+
+@pytest.mark.parametrize("max_size", [1, 2])
+def test_persisted_intents_are_pruned_to_max_size(tmp_path, max_size):
+    path = str(tmp_path / "intents.db")
+    cache = IntentCache(path=path)
+    for i, key in enumerate("abc"):
+        cache.set(key, i, created_at=1e12 + i)
+    reopened = IntentCache(max_size=max_size, path=path)
+    assert [reopened.get(key) for key in "abc"] == [None] * (3 - max_size) + list(range(3 - max_size, 3))
+
+
+def test_identical_intents_query_once():
+    adapter = CountingAdapter()
+    cached = CachedDataAdapter(adapter)
+    north, q1 = Filter(field="region", operator="in", value=["North", "South"]), Filter(field="quarter", operator="eq", value="Q1")
+    first = cached.execute_query(revenue_by_region(north, q1))
+    first.labels.append("changed by the caller")
+    # Filter order, IN value order and the title do not change the result
+    second = cached.execute_query(replace(revenue_by_region(q1, Filter(field="region", operator="in", value=["South", "North"])), title="Other title"))
+    assert adapter.calls == 1
+    assert "changed by the caller" not in second.labels
+    cached.execute_query(revenue_by_region())
+    assert adapter.calls == 2
+
+
+def test_appends_drop_only_affected_results():
+    adapter = CountingAdapter()
+    cached = CachedDataAdapter(adapter)
+    north, south = revenue_by_region(Filter(field="region", operator="eq", value="North")), revenue_by_region(Filter(field="region", operator="eq", value="South"))
+    before = cached.execute_query(north)
+    cached.execute_query(south)
+    cached.append_records("sales", [{"region": "North", "quarter": "Q1", "revenue": 1000}])
+    after = cached.execute_query(north)
+    cached.execute_query(south)
+    assert adapter.calls == 3
+    assert after.datasets[0].data[0] == before.datasets[0].data[0] + 1000
+
+
+def test_invalidate_drops_a_dataset():
+    adapter = CountingAdapter()
+    cached = CachedDataAdapter(adapter)
+    cached.execute_query(revenue_by_region())
+    cached.invalidate("users")
+    cached.execute_query(revenue_by_region())
+    cached.invalidate("sales")
+    cached.execute_query(revenue_by_region())
+    assert adapter.calls == 2
+
+
+def test_results_computed_across_an_append_are_not_cached():
+    class AppendingAdapter(CountingAdapter):
+        def execute_query(self, intent: ChartIntent) -> ChartData:
+            result = super().execute_query(intent)
+            if self.calls == 1:
+                # Another request appends while this query runs, so its result may already be stale
+                cached.append_records("sales", [{"region": "North", "quarter": "Q1", "revenue": 1000}])
+            return result
+
+    adapter = AppendingAdapter()
+    cached = CachedDataAdapter(adapter)
+    cached.execute_query(revenue_by_region())
+    cached.execute_query(revenue_by_region())
+    assert adapter.calls == 2
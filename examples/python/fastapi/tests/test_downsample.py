@@ -0,0 +1,45 @@
+"""LTTB downsampling keeps the shape of long series, including series with gaps."""
+
+import numpy as np
+
+from src.downsample import downsample, lttb_indices
+from src.types import ChartData, ChartDataset
+
+
+def test_keeps_endpoints_and_spikes():
+    series = np.zeros((1, 10_000))
+    series[0, 1234], series[0, 8765] = 50.0, -50.0
+    keep = lttb_indices(series, 100)
+    assert len(keep) == 100
+    assert keep[0] == 0 and keep[-1] == 9_999
+    assert {1234, 8765} <= set(keep.tolist())
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_nan_values_do_not_collapse_the_selection():
+    x = np.linspace(0, 20, 5_000)
+    series = np.vstack([np.sin(x), np.cos(x)])
+    series[0, ::7] = np.nan
+    series[1, 2_000:2_500] = np.nan
+    series[0, 3_333] = 10.0
+    keep = lttb_indices(series, 200)
+    assert len(keep) == 200
+    assert 3_333 in keep.tolist()
+    # Points with a value in some dataset are preferred over points that are gaps in all of them
+    assert not np.isnan(series[:, keep]).all(axis=0).any()
+
+
+def test_all_nan_bucket_keeps_one_point():
+    series = np.arange(1_000, dtype=np.float64)[None, :]
+    series[0, 100:400] = np.nan
+    keep = lttb_indices(series, 50)
+    assert len(keep) == 50
+    assert np.all(np.diff(keep) > 0)
+
+
+def test_downsample_only_long_charts():
+    labels = [str(i) for i in range(3_000)]
+    data = ChartData(labels=labels, datasets=[ChartDataset(label="v", data=[float(i % 17) for i in range(3_000)])])
+    line = downsample(data, "line", {"line": 300})
+    assert len(line.labels) == 300 and len(line.datasets[0].data) == 300
+    assert downsample(data, "bar", {"line": 300}) is data
@@ -0,0 +1,78 @@
+"""The ingest route appends JSONL and CSV bodies for clients holding the ingest token."""
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.adapters import AppendNotSupportedError, DataAdapter, MockDataAdapter
+from src.cache import CachedDataAdapter
+from src.routes import create_ingest_router
+
+TOKEN = "secret-token"
+AUTH = {"Authorization": f"Bearer {TOKEN}"}
+
+
+class ReadOnlyAdapter(DataAdapter):
+    def get_available_datasets(self):
+        return ["sales"]
+
+    def get_available_metrics(self, dataset):
+        return ["revenue"]
+
+    def get_available_dimensions(self, dataset):
+        return ["region"]
+
+    def execute_query(self, intent):
+        raise NotImplementedError
+
+
+def client(adapter: DataAdapter) -> TestClient:
+    app = FastAPI()
+    app.include_router(create_ingest_router(adapter, TOKEN), prefix="/api/datasets")
+    return TestClient(app)
+
+
+@pytest.fixture
+def mock() -> MockDataAdapter:
+    return MockDataAdapter()
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer wrong"}, {"Authorization": TOKEN}])
+def test_requests_without_the_token_are_rejected(mock, headers):
+    before = len(mock.data["sales"])
+    response = client(mock).post("/api/datasets/sales/records", content=b'{"region": "North", "revenue": 1}\n', headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"]["code"] == "UNAUTHORIZED"
+    assert len(mock.data["sales"]) == before
+
+
+def test_appends_jsonl_and_csv(mock):
+    before = len(mock.data["sales"])
+    api = client(CachedDataAdapter(mock))
+    response = api.post("/api/datasets/sales/records", content=b'{"region": "North", "revenue": 5}\n\n{"region": "South", "revenue": 6}\n', headers=AUTH)
+    assert response.status_code == 200 and response.json() == {"appended": 2}
+    response = api.post("/api/datasets/sales/records", content=b"region,revenue\nWest,7\n", headers={**AUTH, "Content-Type": "text/csv"})
+    assert response.status_code == 200 and response.json() == {"appended": 1}
+    assert mock.data["sales"][before:] == [{"region": "North", "revenue": 5}, {"region": "South", "revenue": 6}, {"region": "West", "revenue": 7}]
+
+
+@pytest.mark.parametrize("dataset, body, status, code", [
+    ("nope", b"{}", 404, "UNKNOWN_DATASET"),
+    ("sales", b"[1, 2]", 400, "INVALID_REQUEST"),
+    ("sales", b"{bad", 400, "INVALID_REQUEST"),
+])
+def test_errors_use_the_error_shape(mock, dataset, body, status, code):
+    response = client(mock).post(f"/api/datasets/{dataset}/records", content=body, headers=AUTH)
+    assert response.status_code == status
+    assert response.json()["detail"]["code"] == code
+
+
+def test_read_only_adapter_is_rejected():
+    response = client(CachedDataAdapter(ReadOnlyAdapter())).post("/api/datasets/sales/records", content=b'{"revenue": 1}\n', headers=AUTH)
+    assert response.status_code == 405
+    assert response.json()["detail"]["code"] == "APPEND_NOT_SUPPORTED"
+
+
+def test_base_adapter_refuses_appends():
+    with pytest.raises(AppendNotSupportedError):
+        ReadOnlyAdapter().append_records("sales", [{"revenue": 1}])
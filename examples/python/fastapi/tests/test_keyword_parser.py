@@ -0,0 +1,89 @@
+"""KeywordIntentProvider must answer only prompts it fully understands and pass the rest to the LLM."""
+
+import pytest
+
+from src.adapters import DATASET_METADATA
+from src.intent_resolver import CHART_TYPES
+from src.keyword_parser import KeywordIntentProvider
+from src.llm import IntentContext, IntentResult, LLMProvider
+from src.types import ChartIntent, Dimension, Metric
+
+CONTEXT = IntentContext(datasets=DATASET_METADATA, available_chart_types=CHART_TYPES)
+FALLBACK_INTENT = ChartIntent(dataset="sales", chart_type="bar", metrics=[Metric(field="amount", aggregation="sum")])
+
+
+class RecordingProvider(LLMProvider):
+    def __init__(self):
+        self.prompts: list[str] = []
+
+    def generate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
+        self.prompts.append(prompt)
+        return IntentResult(intent=FALLBACK_INTENT)
+
+
+@pytest.mark.parametrize("prompt, expected", [
+    ("show me the total revenue of the sales by region as a pie chart", ChartIntent(
+        dataset="sales", chart_type="pie", metrics=[Metric(field="revenue", aggregation="sum")], dimensions=[Dimension(field="region")])),
+    ("average price per category", ChartIntent(
+        dataset="products", chart_type="bar", metrics=[Metric(field="price", aggregation="avg")], dimensions=[Dimension(field="category")])),
+    ("active users by channel", ChartIntent(
+        dataset="users", chart_type="bar", metrics=[Metric(field="activeUsers", aggregation="sum")], dimensions=[Dimension(field="channel")])),
+    ("top 5 products by profit", ChartIntent(
+        dataset="products", chart_type="bar", metrics=[Metric(field="profit", aggregation="sum")], dimensions=[Dimension(field="product")],
+        sort_by="value", sort_order="desc", limit=5)),
+    ("monthly signups", ChartIntent(
+        dataset="users", chart_type="line", metrics=[Metric(field="signups", aggregation="sum")], dimensions=[Dimension(field="month")])),
+])
+def test_simple_prompts_are_answered_locally(prompt, expected):
+    fallback = RecordingProvider()
+    provider = KeywordIntentProvider(fallback)
+    assert provider.parse(prompt, CONTEXT) == (expected, 1.0)
+    assert provider.generate_intent(prompt, CONTEXT).intent == expected
+    assert fallback.prompts == []
+    assert provider.stats() == {"hits": 1, "fallbacks": 0}
+
+
+@pytest.mark.parametrize("prompt", [
+    # Unknown words are likely filter values, however many filler words surround them
+    "show me the total revenue of the sales by region as a pie chart for north",
+    "show me the total revenue of the sales by region as a pie chart for electronics",
+    "show me the total revenue of the sales by region as a pie chart for 2024",
+    # Filter words
+    "revenue by region where category is electronics",
+    "revenue by region excluding north",
+    "revenue by month since march",
+    # Ties between datasets
+    "total quantity",
+    "revenue by category",
+    # No metric
+    "sales by region",
+    "show me the chart",
+    "",
+])
+def test_other_prompts_go_to_the_llm(prompt):
+    fallback = RecordingProvider()
+    provider = KeywordIntentProvider(fallback)
+    intent, confidence = provider.parse(prompt, CONTEXT)
+    assert intent is None or confidence < provider.min_confidence
+    assert provider.generate_intent(prompt, CONTEXT).intent == FALLBACK_INTENT
+    assert fallback.prompts == [prompt]
+    assert provider.stats() == {"hits": 0, "fallbacks": 1}
+
+
+def test_filler_words_do_not_raise_confidence():
+    provider = KeywordIntentProvider()
+    _, short = provider.parse("revenue by region for north", CONTEXT)
+    _, padded = provider.parse("please show me the total revenue of the sales by region as a pie chart for north", CONTEXT)
+    assert short == pytest.approx(2 / 3)
+    assert padded == pytest.approx(5 / 6)
+
+
+def test_lower_threshold_accepts_partial_parses():
+    provider = KeywordIntentProvider(min_confidence=0.5)
+    result = provider.generate_intent("revenue by region for north", CONTEXT)
+    assert result.intent.dataset == "sales" and result.intent.filters is None
+
+
+def test_without_fallback_unparsed_prompts_raise():
+    with pytest.raises(ValueError):
+        KeywordIntentProvider().generate_intent("revenue by region for north", CONTEXT)
@@ -0,0 +1,246 @@
+"""OpenAIProvider retries, deadlines, hedging and connection pooling, exercised against a local stub of the chat completions API."""
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.adapters import MockDataAdapter
+from src.intent_resolver import IntentResolver
+from src.llm import IntentContext, LLMConfig, LLMUnavailableError, OpenAIProvider
+from src.routes import create_chart_router
+
+INTENT = json.dumps({"dataset": "sales", "metrics": [{"field": "revenue", "aggregation": "sum"}], "chartType": "bar"})
+CONTEXT = IntentContext(datasets={"sales": {"metrics": ["revenue"], "dimensions": ["region"]}}, available_chart_types=["bar"])
+
+
+class StubServer(ThreadingHTTPServer):
+    """Answers each request with the next planned (delay, status, content) reply, then with a valid intent."""
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.plan: list[tuple[float, int, str]] = []
+        # (time received, client port) per request
+        self.requests: list[tuple[float, int]] = []
+        self.lock = threading.Lock()
+
+    def reply(self, client_port: int) -> tuple[float, int, str]:
+        with self.lock:
+            self.requests.append((time.monotonic(), client_port))
+            return self.plan.pop(0) if self.plan else (0.0, 200, INTENT)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        delay, status, content = self.server.reply(self.client_address[1])
+        time.sleep(delay)
+        if status == 200:
+            message = {"role": "assistant", "content": content}
+            payload = {"id": "stub", "object": "chat.completion", "created": 0, "model": "stub", "choices": [{"index": 0, "finish_reason": "stop", "message": message}]}
+        else:
+            payload = {"error": {"message": f"stub error {status}", "type": "server_error"}}
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except OSError:
+            # The client gave up on this request (timeout or cancelled hedge)
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def stub():
+    server = StubServer()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def server(stub):
+    stub.plan.clear()
+    stub.requests.clear()
+    return stub
+
+
+def provider(server: StubServer, **overrides) -> OpenAIProvider:
+    config = {"api_key": "test", "base_url": f"http://127.0.0.1:{server.server_port}/v1", "retry_backoff": 0.01, **overrides}
+    return OpenAIProvider(LLMConfig(**config))
+
+
+def generate(llm: OpenAIProvider, use_async: bool):
+    if use_async:
+        return asyncio.run(llm.agenerate_intent("revenue", CONTEXT))
+    return llm.generate_intent("revenue", CONTEXT)
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+@pytest.mark.parametrize("status", [429, 500, 503])
+def test_transient_error_is_retried(server, use_async, status):
+    server.plan[:] = [(0, status, ""), (0, status, "")]
+    result = generate(provider(server, max_retries=2), use_async)
+    assert result.intent.dataset == "sales"
+    assert len(server.requests) == 3
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_timed_out_attempt_is_retried(server, use_async):
+    server.plan[:] = [(1.0, 200, INTENT)]
+    started = time.monotonic()
+    result = generate(provider(server, timeout=5, attempt_timeout=0.2, max_retries=1), use_async)
+    assert result.intent.dataset == "sales"
+    assert len(server.requests) == 2
+    assert time.monotonic() - started < 1.0
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_exhausted_retries_raise_unavailable(server, use_async):
+    server.plan[:] = [(0, 500, "")] * 3
+    with pytest.raises(LLMUnavailableError):
+        generate(provider(server, max_retries=2), use_async)
+    assert len(server.requests) == 3
+
+
+def test_client_errors_are_not_retried(server):
+    server.plan[:] = [(0, 400, "")]
+    with pytest.raises(Exception) as error:
+        generate(provider(server, max_retries=2), False)
+    assert not isinstance(error.value, LLMUnavailableError)
+    assert len(server.requests) == 1
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_deadline_covers_every_attempt(server, use_async):
+    server.plan[:] = [(0.15, 500, "")] * 20
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailableError):
+        generate(provider(server, timeout=0.5, max_retries=20), use_async)
+    assert time.monotonic() - started < 0.9
+    assert 1 < len(server.requests) < 20
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_slow_response_is_cut_at_the_deadline(server, use_async):
+    server.plan[:] = [(2.0, 200, INTENT)] * 3
+    started = time.monotonic()
+    with pytest.raises(LLMUnavailableError):
+        generate(provider(server, timeout=0.4, max_retries=2), use_async)
+    assert time.monotonic() - started < 0.9
+
+
+def test_retry_delay_is_jittered_below_the_backoff(server):
+    llm = provider(server, retry_backoff=0.5, max_retries=3)
+    deadline = time.monotonic() + 60
+    delays = [llm._retry_delay(1, deadline) for _ in range(50)]
+    assert all(0 <= delay <= 1.0 for delay in delays)
+    assert len(set(delays)) > 1
+    assert llm._retry_delay(3, deadline) is None
+    # No retry is scheduled that could not start before the deadline
+    assert llm._retry_delay(0, time.monotonic()) is None
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_hedged_request_wins_over_a_slow_one(server, use_async):
+    server.plan[:] = [(1.5, 200, INTENT), (0, 200, INTENT)]
+    started = time.monotonic()
+    result = generate(provider(server, hedge_after=0.1), use_async)
+    assert result.intent.dataset == "sales"
+    assert time.monotonic() - started < 1.0
+    assert len(server.requests) == 2
+    # Sent after the hedge delay (less the first request's connection setup), not together with the first
+    assert server.requests[1][0] - server.requests[0][0] >= 0.05
+
+
+@pytest.mark.parametrize("use_async", [False, True])
+def test_hedge_takes_the_first_valid_result(server, use_async):
+    # The hedge answers first but with an unusable body, so the original request's intent is returned
+    server.plan[:] = [(0.4, 200, INTENT), (0, 200, "not json")]
+    result = generate(provider(server, hedge_after=0.1), use_async)
+    assert result.intent.dataset == "sales"
+    assert len(server.requests) == 2
+
+
+def test_fast_response_is_not_hedged(server):
+    generate(provider(server, hedge_after=0.5), False)
+    assert len(server.requests) == 1
+
+
+def test_async_hedge_cancels_the_slower_request(server):
+    llm = provider(server, hedge_after=0.1)
+    complete = llm._acomplete
+    cancelled = []
+
+    async def tracked(request, deadline):
+        try:
+            return await complete(request, deadline)
+        except asyncio.CancelledError:
+            cancelled.append(time.monotonic())
+            raise
+
+    llm._acomplete = tracked
+
+    async def run():
+        result = await llm.agenerate_intent("revenue", CONTEXT)
+        # Let the cancelled request unwind; the stub would only answer it after 2 s
+        await asyncio.sleep(0.05)
+        return result, time.monotonic()
+
+    server.plan[:] = [(2.0, 200, INTENT), (0, 200, INTENT)]
+    result, finished = asyncio.run(run())
+    assert result.intent.dataset == "sales"
+    assert len(cancelled) == 1
+    assert cancelled[0] <= finished
+
+
+def test_hedge_delay_follows_observed_p95(server):
+    llm = provider(server, hedge_after=5.0)
+    for _ in range(20):
+        generate(llm, False)
+    assert llm._hedge_delay() < 1.0
+
+
+def test_connection_is_reused_across_calls(server):
+    llm = provider(server)
+    for _ in range(5):
+        generate(llm, False)
+    assert len(server.requests) == 5
+    assert len({port for _, port in server.requests}) == 1
+
+
+def test_async_connection_is_reused_across_calls(server):
+    llm = provider(server)
+
+    async def run():
+        for _ in range(5):
+            await llm.agenerate_intent("revenue", CONTEXT)
+
+    asyncio.run(run())
+    assert len(server.requests) == 5
+    assert len({port for _, port in server.requests}) == 1
+
+
+def test_route_returns_503_when_llm_is_unavailable(server):
+    server.plan[:] = [(0, 503, "")] * 3
+    app = FastAPI()
+    app.include_router(create_chart_router(IntentResolver(provider(server, max_retries=2), MockDataAdapter())), prefix="/api/chart")
+    response = TestClient(app).post("/api/chart/", json={"prompt": "revenue by region"})
+    assert response.status_code == 503
+    assert response.json()["detail"]["code"] == "LLM_UNAVAILABLE"
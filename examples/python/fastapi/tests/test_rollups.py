@@ -0,0 +1,100 @@
+"""RollupDataAdapter must answer from its cubes with the same charts as a full scan by MockDataAdapter."""
+
+import asyncio
+import threading
+
+import pytest
+
+from src.adapters import MockDataAdapter
+from src.columnar import ColumnarDataAdapter
+from src.rollups import RollupDataAdapter
+from src.types import ChartData, ChartIntent, Dimension, Filter, Metric
+
+METADATA = {"events": {"metrics": ["revenue"], "dimensions": ["date", "region", "month"]}}
+DATA = {
+    "events": [
+        {"date": "2024-03-14", "region": "North", "month": "Mar", "revenue": 10},
+        {"date": "2024-01-02", "region": "South", "month": "Jan", "revenue": 20},
+        {"date": "2024-02-29T12:00:00", "region": "North", "month": "Feb", "revenue": 30},
+        {"date": "2024-05-05", "region": "North", "month": "May", "revenue": 40},
+        {"date": "2024-01-02", "region": "North", "month": "Jan", "revenue": 5},
+        {"date": "2024-06-01", "region": "South", "month": "Jun", "revenue": 60},
+        # No date: left off time axes
+        {"region": "South", "month": "Jun", "revenue": 70},
+    ]
+}
+APPENDED = [{"date": "2024-09-30", "region": "West", "month": "Sep", "revenue": 80}, {"date": "2024-01-15", "region": "North", "month": "Jan", "revenue": 1}]
+
+
+@pytest.fixture
+def adapters() -> tuple[MockDataAdapter, RollupDataAdapter]:
+    data = {name: list(records) for name, records in DATA.items()}
+    rollups = RollupDataAdapter(ColumnarDataAdapter(data, metadata=METADATA), data, METADATA, {"events": [("date", "region")]})
+    return MockDataAdapter(data), rollups
+
+
+def chart(data: ChartData) -> tuple[list[str], list[tuple[str, list[float]]]]:
+    return data.labels, [(dataset.label, [float(value) for value in dataset.data]) for dataset in data.datasets]
+
+
+def intent(dimensions: list[Dimension], aggregation: str = "sum", **kwargs) -> ChartIntent:
+    return ChartIntent(dataset="events", chart_type="line", metrics=[Metric(field="revenue", aggregation=aggregation)], dimensions=dimensions, **kwargs)
+
+
+@pytest.mark.parametrize("granularity", ["day", "week", "month", "quarter", "year"])
+@pytest.mark.parametrize("aggregation", ["sum", "avg", "max"])
+@pytest.mark.parametrize("split", [False, True])
+def test_date_buckets_are_rolled_up_from_the_cube(adapters, granularity, aggregation, split):
+    mock, rollups = adapters
+    query = intent([Dimension(field="date", granularity=granularity)] + ([Dimension(field="region")] if split else []), aggregation)
+    assert rollups.find_cube(query) is not None
+    assert chart(rollups.execute_query(query)) == chart(mock.execute_query(query))
+
+
+def test_filtered_buckets_use_a_combined_cube(adapters):
+    mock, rollups = adapters
+    query = intent([Dimension(field="date", granularity="month")], filters=[Filter(field="region", operator="eq", value="North")])
+    assert rollups.find_cube(query).dimensions == ("date", "region")
+    assert chart(rollups.execute_query(query)) == chart(mock.execute_query(query))
+
+
+def test_granularity_on_non_date_field_keeps_values(adapters):
+    mock, rollups = adapters
+    query = intent([Dimension(field="month", granularity="month")])
+    assert chart(rollups.execute_query(query))[0] == ["Mar", "Jan", "Feb", "May", "Jun"]
+    assert chart(rollups.execute_query(query)) == chart(mock.execute_query(query))
+
+
+def test_appended_records_reach_the_buckets(adapters):
+    mock, rollups = adapters
+    query = intent([Dimension(field="date", granularity="quarter")])
+    rollups.append_records("events", APPENDED)
+    mock.append_records("events", APPENDED)
+    assert chart(rollups.execute_query(query)) == (["2024-Q1", "2024-Q2", "2024-Q3"], [("sum(revenue)", [66.0, 100.0, 80.0])])
+    assert chart(rollups.execute_query(query)) == chart(mock.execute_query(query))
+
+
+def test_async_query_waits_for_appends_off_the_event_loop(adapters):
+    mock, rollups = adapters
+
+    async def scenario() -> tuple[ChartData, int]:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.sleep(0)
+        # Simulate an append holding the lock for a whole batch
+        rollups._lock.acquire()
+        threading.Timer(0.05, rollups._lock.release).start()
+        result = await rollups.aexecute_query(intent([Dimension(field="region")]))
+        ticker.cancel()
+        return result, ticks
+
+    result, ticks = asyncio.run(scenario())
+    assert ticks > 5
+    assert chart(result) == chart(mock.execute_query(intent([Dimension(field="region")])))
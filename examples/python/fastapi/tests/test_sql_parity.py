@@ -0,0 +1,96 @@
+"""SQLDataAdapter must draw the same charts as MockDataAdapter for sorted, limited and split intents."""
+
+import pytest
+
+from src.adapters import MockDataAdapter
+from src.sql_adapter import SQLiteDataAdapter
+from src.types import ChartData, ChartIntent, Dimension, Metric
+
+METADATA = {
+    "sales": {"metrics": ["revenue", "quantity"], "dimensions": ["month", "region", "year"]},
+    "events": {"metrics": ["revenue"], "dimensions": ["date", "region"]},
+}
+# Jan holds the largest single cell, Feb the largest total; Mar and the West region are small
+DATA = {
+    "sales": [
+        {"month": "Jan", "region": "North", "year": 2024, "revenue": 100, "quantity": 1},
+        {"month": "Feb", "region": "North", "year": 2024, "revenue": 60, "quantity": 2},
+        {"month": "Feb", "region": "South", "year": 2024, "revenue": 60, "quantity": 3},
+        {"month": "Mar", "region": "West", "year": 2024, "revenue": 5, "quantity": 4},
+        {"month": "Apr", "region": "South", "year": 2025, "revenue": 30, "quantity": 5},
+        {"month": "Apr", "region": "North", "year": 2025, "revenue": 20, "quantity": 6},
+    ],
+    # Dates out of order and spread over every month of two quarters, so no bucket is empty
+    "events": [
+        {"date": "2024-03-14", "region": "North", "revenue": 10},
+        {"date": "2024-01-02", "region": "South", "revenue": 20},
+        {"date": "2024-02-29T12:00:00", "region": "North", "revenue": 30},
+        {"date": "2024-05-05", "region": "North", "revenue": 40},
+        {"date": "2024-04-30", "region": "South", "revenue": 50},
+        {"date": "2024-06-01", "region": "South", "revenue": 60},
+        {"date": "2024-01-31", "region": "North", "revenue": 70},
+    ],
+}
+
+
+@pytest.fixture(scope="module")
+def adapters() -> tuple[MockDataAdapter, SQLiteDataAdapter]:
+    return MockDataAdapter(DATA), SQLiteDataAdapter.from_records(DATA, METADATA)
+
+
+def intent(dimensions: list[str | Dimension], aggregation: str = "sum", dataset: str = "sales", **kwargs) -> ChartIntent:
+    return ChartIntent(
+        dataset=dataset,
+        chart_type="bar",
+        metrics=[Metric(field="revenue", aggregation=aggregation)],
+        dimensions=[d if isinstance(d, Dimension) else Dimension(field=d) for d in dimensions],
+        **kwargs,
+    )
+
+
+def chart(data: ChartData) -> tuple[list[str], list[tuple[str, list[float]]]]:
+    return data.labels, [(dataset.label, [float(value) for value in dataset.data]) for dataset in data.datasets]
+
+
+@pytest.mark.parametrize("dimensions", [["month"], ["month", "region"]])
+@pytest.mark.parametrize("aggregation", ["sum", "avg", "max", "count"])
+@pytest.mark.parametrize("sort_order", [None, "desc", "asc"])
+@pytest.mark.parametrize("limit", [None, 1, 2])
+@pytest.mark.parametrize("show_other", [False, True])
+def test_matches_mock_adapter(adapters, dimensions, aggregation, sort_order, limit, show_other):
+    mock, sql = adapters
+    query = intent(dimensions, aggregation, sort_by="value" if sort_order else None, sort_order=sort_order, limit=limit, show_other=show_other)
+    assert chart(sql.execute_query(query)) == chart(mock.execute_query(query))
+
+
+def test_split_ranks_labels_on_their_total(adapters):
+    _, sql = adapters
+    labels, datasets = chart(sql.execute_query(intent(["month", "region"], sort_by="value", sort_order="desc", limit=1)))
+    assert labels == ["Feb"]
+    # West only has values outside the kept label, so it is not drawn
+    assert datasets == [("North", [60.0]), ("South", [60.0])]
+
+
+def test_other_collects_the_remaining_labels(adapters):
+    _, sql = adapters
+    labels, datasets = chart(sql.execute_query(intent(["month"], sort_by="value", sort_order="desc", limit=2, show_other=True)))
+    assert labels == ["Feb", "Jan", "Other"]
+    assert datasets == [("sum(revenue)", [120.0, 100.0, 55.0])]
+
+
+@pytest.mark.parametrize("granularity", ["month", "quarter", "year"])
+@pytest.mark.parametrize("split", [False, True])
+@pytest.mark.parametrize("sort_order", [None, "desc"])
+def test_date_buckets_match_mock_adapter(adapters, granularity, split, sort_order):
+    mock, sql = adapters
+    dimensions = [Dimension(field="date", granularity=granularity)] + (["region"] if split else [])
+    query = intent(dimensions, dataset="events", sort_by="value" if sort_order else None, sort_order=sort_order)
+    assert chart(sql.execute_query(query)) == chart(mock.execute_query(query))
+
+
+@pytest.mark.parametrize("field, granularity, labels", [("month", "month", ["Jan", "Feb", "Mar", "Apr"]), ("year", "year", ["2024", "2025"])])
+def test_granularity_on_non_date_field_keeps_values(adapters, field, granularity, labels):
+    mock, sql = adapters
+    query = intent([Dimension(field=field, granularity=granularity)])
+    assert chart(sql.execute_query(query))[0] == labels
+    assert chart(sql.execute_query(query)) == chart(mock.execute_query(query))
@@ -8,13 +8,36 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 
 from .llm import OpenAIProvider, LLMConfig
-from .adapters import MockDataAdapter
+from .cache import CachedLLMProvider, IntentCache, CachedDataAdapter, ResultCache
+from .keyword_parser import KeywordIntentProvider
+from .adapters import DataAdapter, MockDataAdapter, MOCK_DATA
+from .columnar import ColumnarDataAdapter
+from .store import open_store, write_store
+from .parallel import ParallelColumnarDataAdapter
+from .sql_adapter import SQLiteDataAdapter
+from .rollups import RollupDataAdapter
+from .downsample import parse_targets
 from .intent_resolver import IntentResolver
-from .routes import create_chart_blueprint
+from .routes import create_chart_blueprint, create_ingest_blueprint
 
 load_dotenv()
 
 
+def create_data_adapter(kind: str, rollups: bool = False) -> DataAdapter:
+    if kind == "sqlite":
+        path = os.getenv("SQLITE_PATH")
+        return SQLiteDataAdapter(path) if path else SQLiteDataAdapter.from_records(MOCK_DATA)
+    if kind == "store":
+        path = os.getenv("STORE_PATH", "data")
+        if not os.path.isdir(path):
+            write_store(path)
+        workers = int(os.getenv("PARALLEL_WORKERS", 0))
+        return ParallelColumnarDataAdapter(path, workers) if workers > 1 else open_store(path)
+    adapter = ColumnarDataAdapter() if kind == "columnar" else MockDataAdapter()
+    # Rollups are built from the in-memory records, so they only apply to the in-memory adapters
+    return RollupDataAdapter(adapter) if rollups else adapter
+
+
 def create_app() -> Flask:
     app = Flask(__name__)
     CORS(app)
@@ -24,15 +47,35 @@ def create_app() -> Flask:
     if not api_key:
         print("Warning: OPENAI_API_KEY not set. LLM features will not work.")
 
-    llm_provider = OpenAIProvider(LLMConfig(
-        api_key=api_key or "",
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-    ))
-    data_adapter = MockDataAdapter()
-    intent_resolver = IntentResolver(llm_provider, data_adapter)
+    llm_provider = CachedLLMProvider(
+        OpenAIProvider(LLMConfig(
+            api_key=api_key or "",
+            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
+            timeout=float(os.getenv("LLM_TIMEOUT", 30)),
+            attempt_timeout=float(os.environ["LLM_ATTEMPT_TIMEOUT"]) if os.getenv("LLM_ATTEMPT_TIMEOUT") else None,
+            max_retries=int(os.getenv("LLM_MAX_RETRIES", 2)),
+            hedge_after=float(os.environ["LLM_HEDGE_AFTER"]) if os.getenv("LLM_HEDGE_AFTER") else None,
+            max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", 20)),
+            context_tokens=int(os.getenv("LLM_CONTEXT_TOKENS", 2000)) or None,
+        )),
+        IntentCache(
+            max_size=int(os.getenv("INTENT_CACHE_SIZE", 1000)),
+            ttl=float(os.getenv("INTENT_CACHE_TTL", 3600)),
+            path=os.getenv("INTENT_CACHE_PATH"),
+        ),
+    )
+    # Simple prompts are parsed locally; the rest go to the LLM
+    if os.getenv("FAST_PATH", "true").lower() not in ("0", "false", "no"):
+        llm_provider = KeywordIntentProvider(llm_provider)
+    data_adapter = CachedDataAdapter(create_data_adapter(os.getenv("DATA_ADAPTER", "mock"), os.getenv("ROLLUPS", "").lower() in ("1", "true", "yes")), ResultCache(max_size=int(os.getenv("RESULT_CACHE_SIZE", 500))))
+    intent_resolver = IntentResolver(llm_provider, data_adapter, parse_targets(os.getenv("DOWNSAMPLE_POINTS", "")))
 
     # Register routes
     app.register_blueprint(create_chart_blueprint(intent_resolver), url_prefix="/api/chart")
+    # Writing data is opt-in and token-protected, since CORS lets any page call the API
+    ingest_token = os.getenv("INGEST_TOKEN")
+    if ingest_token:
+        app.register_blueprint(create_ingest_blueprint(data_adapter, ingest_token), url_prefix="/api/datasets")
 
     @app.route("/health")
     def health_check():
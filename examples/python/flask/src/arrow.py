@@ -0,0 +1,47 @@
+"""Arrow IPC encoding of chart responses."""
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # optional: clients asking for Arrow get JSON without it
+    pa = None
+
+from .serialization import dumps
+from .types import ChartResponse, chart_spec_to_dict, compact_colors
+
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+
+
+def accepts_arrow(accept: str | None) -> bool:
+    """True when the client asked for an Arrow stream and pyarrow is available."""
+    return pa is not None and accept is not None and ARROW_STREAM in accept
+
+
+def response_to_arrow(response: ChartResponse) -> bytes:
+    """Encode a chart response as an Arrow IPC stream holding one record batch.
+
+    The batch has a string "label" column and one float64 column per dataset. The chart spec and metadata
+    travel as JSON in the schema metadata and each dataset's label and colors in its field metadata.
+    Values held in float64 NumPy arrays (as returned by the columnar adapter) are wrapped without copying.
+    """
+    data = response.data
+    fields = [pa.field("label", pa.string())]
+    columns = [pa.array(data.labels, type=pa.string())]
+    for ds in data.datasets:
+        fields.append(pa.field(ds.label, pa.float64(), metadata={
+            "label": ds.label,
+            "backgroundColor": dumps(compact_colors(ds.background_color)),
+            "borderColor": dumps(compact_colors(ds.border_color)),
+            "borderWidth": str(ds.border_width),
+        }))
+        columns.append(pa.array(np.asarray(ds.data, dtype=np.float64)))
+    schema = pa.schema(fields, metadata={
+        "chartSpec": dumps(chart_spec_to_dict(response.chart_spec)),
+        "metadata": dumps(response.metadata),
+    })
+
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        writer.write_batch(pa.record_batch(columns, schema=schema))
+    return sink.getvalue().to_pybytes()
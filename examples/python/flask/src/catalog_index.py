@@ -0,0 +1,61 @@
+"""Ranking of catalog datasets against a prompt, used to keep large catalogs out of LLM requests."""
+
+import math
+import re
+from collections import Counter
+
+# BM25 term-frequency saturation and document-length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Words of a dataset's own name count this many times, so "orders by status" prefers orders over a dataset with a status field
+NAME_WEIGHT = 2
+
+
+def terms(text: str) -> list[str]:
+    """Lowercase words of text, with camelCase and snake_case split and plural endings dropped."""
+    words = re.findall(r"[A-Z]?[a-z0-9]+|[A-Z]+(?![a-z])", text)
+    return [_singular(word.casefold()) for word in words]
+
+
+def _singular(word: str) -> str:
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+class CatalogIndex:
+    """BM25 index with one document per dataset, made of its name, metric and dimension names (and description, if any).
+
+    Built once per catalog version; ranking a prompt only touches the prompt's terms.
+    """
+
+    def __init__(self, datasets: dict[str, dict]):
+        self.names = list(datasets)
+        self.documents: list[Counter] = []
+        for name, meta in datasets.items():
+            words = terms(name) * NAME_WEIGHT
+            for field in [*meta.get("metrics", []), *meta.get("dimensions", [])]:
+                words += terms(field)
+            words += terms(meta.get("description") or "")
+            self.documents.append(Counter(words))
+        self.lengths = [sum(document.values()) for document in self.documents]
+        self.average_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+        frequency = Counter(term for document in self.documents for term in document)
+        self.idf = {term: math.log(1 + (len(self.documents) - df + 0.5) / (df + 0.5)) for term, df in frequency.items()}
+
+    def rank(self, prompt: str) -> list[tuple[str, float]]:
+        """Datasets with their scores, best first. Datasets sharing no term with the prompt score 0 and keep catalog order."""
+        query = [term for term in set(terms(prompt)) if term in self.idf]
+        scores = []
+        for document, length in zip(self.documents, self.lengths):
+            score = 0.0
+            for term in query:
+                tf = document.get(term, 0)
+                if tf:
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / self.average_length)
+                    score += self.idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+            scores.append(score)
+        order = sorted(range(len(self.names)), key=lambda i: -scores[i])
+        return [(self.names[i], scores[i]) for i in order]
@@ -0,0 +1,71 @@
+"""Secondary indexes for columnar tables."""
+
+import numpy as np
+
+from .aggregation import NUMERIC_TYPES
+from .filters import between_bounds
+from .types import Filter
+
+
+class PostingIndex:
+    """Row ids of a dictionary-encoded column grouped by code (one sorted posting list per distinct value)."""
+
+    def __init__(self, rows: np.ndarray, offsets: np.ndarray):
+        self.rows = rows
+        self.offsets = offsets
+
+    @classmethod
+    def build(cls, codes: np.ndarray, cardinality: int) -> "PostingIndex":
+        offsets = np.zeros(cardinality + 1, dtype=np.int64)
+        np.cumsum(np.bincount(codes, minlength=cardinality), out=offsets[1:])
+        return cls(np.argsort(codes, kind="stable"), offsets)
+
+    def count(self, matches: np.ndarray) -> int:
+        """Number of indexed rows whose code is flagged in matches (a boolean array over the dictionary)."""
+        # The dictionary may have grown since the index was built; newer codes have no indexed rows
+        return int(np.diff(self.offsets)[matches[:len(self.offsets) - 1]].sum())
+
+    def lookup(self, matches: np.ndarray) -> np.ndarray:
+        postings = [self.rows[self.offsets[code]:self.offsets[code + 1]] for code in np.flatnonzero(matches[:len(self.offsets) - 1])]
+        if len(postings) == 1:
+            return postings[0]
+        return np.sort(np.concatenate(postings)) if postings else np.empty(0, dtype=np.intp)
+
+
+class SortedIndex:
+    """Row ids of a numeric column ordered by value, so comparisons become binary-searched ranges."""
+
+    def __init__(self, rows: np.ndarray, values: np.ndarray):
+        self.rows = rows
+        self.values = values
+
+    @classmethod
+    def build(cls, values: np.ndarray) -> "SortedIndex":
+        valid = np.flatnonzero(~np.isnan(values))
+        rows = valid[np.argsort(values[valid], kind="stable")]
+        return cls(rows, values[rows])
+
+    def range(self, f: Filter) -> tuple[int, int] | None:
+        """Slice bounds into the index matching the filter, or None when the operator is not a range lookup."""
+        if f.operator == "between":
+            low, high = between_bounds(f)
+            return self._search(low, "left"), self._search(high, "right")
+        if f.operator not in ("eq", "gt", "gte", "lt", "lte"):
+            return None
+        if not isinstance(f.value, NUMERIC_TYPES):
+            return 0, 0
+        if f.operator == "eq":
+            return self._search(f.value, "left"), self._search(f.value, "right")
+        if f.operator == "gt":
+            return self._search(f.value, "right"), len(self.rows)
+        if f.operator == "gte":
+            return self._search(f.value, "left"), len(self.rows)
+        if f.operator == "lt":
+            return 0, self._search(f.value, "left")
+        return 0, self._search(f.value, "right")
+
+    def lookup(self, start: int, stop: int) -> np.ndarray:
+        return np.sort(self.rows[start:stop])
+
+    def _search(self, value: int | float, side: str) -> int:
+        return int(np.searchsorted(self.values, value, side=side))
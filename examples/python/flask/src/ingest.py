@@ -0,0 +1,58 @@
+"""Batched ingestion of JSONL and CSV record streams into a data adapter."""
+
+import csv
+import json
+import re
+from itertools import islice
+from typing import Any, Iterable, Iterator
+
+from .adapters import AppendNotSupportedError, DataAdapter
+from .types import Dataset
+
+# Records per append_records call: larger batches amortize index, rollup and cache maintenance
+BATCH_SIZE = 1000
+
+INTEGER = re.compile(r"^-?(0|[1-9]\d*)$")
+
+
+def read_jsonl(lines: Iterable[str]) -> Iterator[dict[str, Any]]:
+    """One record per non-empty line."""
+    for line in lines:
+        if line.strip():
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError(f"Expected a JSON object per line, got {type(record).__name__}")
+            yield record
+
+
+def read_csv(lines: Iterable[str], metrics: Iterable[str] = ()) -> Iterator[dict[str, Any]]:
+    """Records from CSV text with a header row. Metric cells are parsed as numbers, other integer cells as ints, empty cells are left out."""
+    metrics = set(metrics)
+    for row in csv.DictReader(lines):
+        yield {field: _parse_cell(value, field in metrics) for field, value in row.items() if field is not None and value not in ("", None)}
+
+
+def append_stream(adapter: DataAdapter, dataset: Dataset, records: Iterable[dict[str, Any]], batch_size: int = BATCH_SIZE) -> int:
+    """Append records in batches, so indexes, rollups and cached results are maintained once per batch. Returns the number appended.
+
+    Batches appended before a malformed record is read are kept.
+    """
+    if not adapter.supports_append:
+        raise AppendNotSupportedError(f"Dataset {dataset} is read-only: the configured data adapter does not support appending records")
+    appended = 0
+    iterator = iter(records)
+    while batch := list(islice(iterator, batch_size)):
+        adapter.append_records(dataset, batch)
+        appended += len(batch)
+    return appended
+
+
+def _parse_cell(value: str, is_metric: bool) -> Any:
+    if INTEGER.match(value):
+        return int(value)
+    if is_metric:
+        try:
+            return float(value)
+        except ValueError:
+            return value
+    return value
@@ -1,20 +1,59 @@
 """LLM provider for PromptChart."""
 
+import asyncio
 import json
+import random
+import threading
+import time
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
 from dataclasses import dataclass
-from typing import Any
+from typing import Any, Awaitable, Callable, Iterable
 
-from openai import OpenAI
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
+from .catalog_index import CatalogIndex
 from .types import ChartIntent, Metric, Dimension, Filter
 
 
+# Receives the number of response characters generated so far
+ProgressCallback = Callable[[int], None]
+
+# Errors after which the same request may succeed (timeouts are APIConnectionErrors)
+TRANSIENT_ERRORS = (APIConnectionError, RateLimitError, InternalServerError)
+
+# Completed calls needed before hedging waits for the observed p95 latency instead of LLMConfig.hedge_after
+HEDGE_MIN_SAMPLES = 20
+HEDGE_WINDOW = 200
+
+# Rough characters per token of English and identifiers, used to estimate prompt size without a tokenizer
+CHARS_PER_TOKEN = 4
+
+
+class LLMUnavailableError(Exception):
+    """The LLM gave no usable response within the call's deadline and retries."""
+
+
+def estimate_tokens(text: str) -> int:
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
 @dataclass
 class LLMConfig:
     api_key: str
     model: str = "gpt-4o-mini"
     max_tokens: int = 1000
     temperature: float = 0.1
+    base_url: str | None = None  # defaults to OPENAI_BASE_URL or the OpenAI API
+    timeout: float = 30.0  # hard deadline in seconds for a call, retries and hedged requests included
+    connect_timeout: float = 5.0
+    attempt_timeout: float | None = None  # seconds one attempt may take before it is retried; None lets it use the whole deadline
+    max_retries: int = 2  # further attempts after a transient error
+    retry_backoff: float = 0.5  # seconds, doubled per retry; the actual delay is drawn uniformly below it
+    hedge_after: float | None = None  # seconds before a second request is raced against a slow one; None disables hedging
+    max_connections: int = 20
+    context_tokens: int | None = 2000  # catalogs estimated above this are pruned to the datasets most relevant to each prompt
 
 
 @dataclass
@@ -22,6 +61,7 @@ class IntentContext:
     datasets: dict[str, dict[str, list[str]]]  # {name: {metrics: [...], dimensions: [...]}}
     available_chart_types: list[str]
     additional_context: dict[str, Any] | None = None
+    version: str | None = None  # changes whenever datasets or chart types change
 
 
 @dataclass
@@ -34,6 +74,17 @@ class LLMProvider(ABC):
     @abstractmethod
     def generate_intent(self, prompt: str, context: IntentContext) -> IntentResult: ...
 
+    async def agenerate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
+        """Async variant. Providers without a native async client run the blocking call in a worker thread."""
+        return await asyncio.to_thread(self.generate_intent, prompt, context)
+
+    def stream_intent(self, prompt: str, context: IntentContext, on_progress: ProgressCallback) -> IntentResult:
+        """Like generate_intent, reporting progress while the response streams in. Defaults to no progress."""
+        return self.generate_intent(prompt, context)
+
+    async def astream_intent(self, prompt: str, context: IntentContext, on_progress: ProgressCallback) -> IntentResult:
+        return await asyncio.to_thread(self.stream_intent, prompt, context, on_progress)
+
 
 SYSTEM_PROMPT = """You are a data visualization assistant. Convert natural language requests into JSON chart specifications.
 
@@ -42,41 +93,246 @@ Respond with valid JSON only:
   "dataset": string,
   "metrics": [{"field": string, "aggregation": "sum"|"avg"|"min"|"max"|"count"}],
   "dimensions": [{"field": string, "granularity": "day"|"week"|"month"|"quarter"|"year"}],
-  "filters": [{"field": string, "operator": "eq"|"neq"|"gt"|"gte"|"lt"|"lte"|"in", "value": any}],
+  "filters": [{"field": string, "operator": "eq"|"neq"|"gt"|"gte"|"lt"|"lte"|"in"|"between", "value": any}],
   "chartType": "bar"|"line"|"pie"|"doughnut"|"area"|"scatter",
-  "title": string
+  "title": string,
+  "sortBy": "value"|"label"|"date",
+  "sortOrder": "asc"|"desc",
+  "limit": number,
+  "showOther": boolean
 }
 
-Use only metrics/dimensions from the chosen dataset. Choose appropriate chart types."""
+Use only metrics/dimensions from the chosen dataset. Choose appropriate chart types.
+For "in" filters use an array of values, for "between" filters use [low, high] (inclusive).
+To split a chart into one series per value of another field (e.g. "revenue by month split by region"), add it as a second dimension.
+For "top N" requests sort by value descending and set limit; set showOther to add the remaining groups as one "Other" entry."""
 
 
 class OpenAIProvider(LLMProvider):
     def __init__(self, config: LLMConfig):
-        self.client = OpenAI(api_key=config.api_key)
+        # Keep-alive connections are pooled per client; retries are done here so they share the call's deadline
+        limits = httpx.Limits(max_connections=config.max_connections, max_keepalive_connections=config.max_connections)
+        timeout = httpx.Timeout(config.timeout, connect=config.connect_timeout)
+        self.client = OpenAI(
+            api_key=config.api_key, base_url=config.base_url, timeout=timeout, max_retries=0,
+            http_client=httpx.Client(limits=limits, timeout=timeout),
+        )
+        self.async_client = AsyncOpenAI(
+            api_key=config.api_key, base_url=config.base_url, timeout=timeout, max_retries=0,
+            http_client=httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
         self.model = config.model
         self.max_tokens = config.max_tokens
         self.temperature = config.temperature
+        self.timeout = config.timeout
+        self.attempt_timeout = config.attempt_timeout
+        self.max_retries = config.max_retries
+        self.retry_backoff = config.retry_backoff
+        self.hedge_after = config.hedge_after
+        self.context_tokens = config.context_tokens
+        self._latencies: deque[float] = deque(maxlen=HEDGE_WINDOW)
+        self._hedge_executor: ThreadPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # (context version, full context message, line per dataset, index when the catalog is over the token budget)
+        self._rendered_context: tuple[str | None, str, dict[str, str], CatalogIndex | None] | None = None
 
     def generate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
-        dataset_info = "\n".join(
-            f"  {name}: metrics=[{', '.join(meta['metrics'])}], dimensions=[{', '.join(meta['dimensions'])}]"
-            for name, meta in context.datasets.items()
-        )
+        request = self._request(prompt, context)
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._hedged(lambda: self._complete(request, deadline), deadline)
+            except TRANSIENT_ERRORS as e:
+                error = e
+                delay = self._retry_delay(attempt, deadline)
+                if delay is None:
+                    break
+                time.sleep(delay)
+        raise LLMUnavailableError(f"LLM request failed: {error}") from error
 
-        context_message = f"Available datasets:\n{dataset_info}\nChart types: {', '.join(context.available_chart_types)}"
+    async def agenerate_intent(self, prompt: str, context: IntentContext) -> IntentResult:
+        request = self._request(prompt, context)
+        deadline = time.monotonic() + self.timeout
+        for attempt in range(self.max_retries + 1):
+            try:
+                return await self._ahedged(lambda: self._acomplete(request, deadline), deadline)
+            except TRANSIENT_ERRORS as e:
+                error = e
+                delay = self._retry_delay(attempt, deadline)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        raise LLMUnavailableError(f"LLM request failed: {error}") from error
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
+    def stream_intent(self, prompt: str, context: IntentContext, on_progress: ProgressCallback) -> IntentResult:
+        # Progress already reported cannot be taken back, so streams use the client timeouts but are neither retried nor hedged
+        chunks: list[str] = []
+        received = 0
+        try:
+            for chunk in self.client.chat.completions.create(**self._request(prompt, context), stream=True):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    chunks.append(delta)
+                    received += len(delta)
+                    on_progress(received)
+        except TRANSIENT_ERRORS as e:
+            raise LLMUnavailableError(f"LLM request failed: {e}") from e
+        return self._to_result("".join(chunks))
+
+    async def astream_intent(self, prompt: str, context: IntentContext, on_progress: ProgressCallback) -> IntentResult:
+        chunks: list[str] = []
+        received = 0
+        try:
+            async for chunk in await self.async_client.chat.completions.create(**self._request(prompt, context), stream=True):
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    chunks.append(delta)
+                    received += len(delta)
+                    on_progress(received)
+        except TRANSIENT_ERRORS as e:
+            raise LLMUnavailableError(f"LLM request failed: {e}") from e
+        return self._to_result("".join(chunks))
+
+    def _complete(self, request: dict[str, Any], deadline: float) -> IntentResult:
+        started = time.monotonic()
+        response = self.client.chat.completions.create(**request, timeout=self._attempt_timeout(deadline))
+        result = self._to_result(response.choices[0].message.content)
+        self._latencies.append(time.monotonic() - started)
+        return result
+
+    async def _acomplete(self, request: dict[str, Any], deadline: float) -> IntentResult:
+        started = time.monotonic()
+        response = await self.async_client.chat.completions.create(**request, timeout=self._attempt_timeout(deadline))
+        result = self._to_result(response.choices[0].message.content)
+        self._latencies.append(time.monotonic() - started)
+        return result
+
+    def _hedged(self, call: Callable[[], IntentResult], deadline: float) -> IntentResult:
+        """Run call; if it has not finished after the hedge delay, race a second one and return the first valid result."""
+        delay = self._hedge_delay()
+        if delay is None:
+            return call()
+        executor = self._get_hedge_executor()
+        first = executor.submit(call)
+        try:
+            return first.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        pending = {first, executor.submit(call)}
+        while pending:
+            done, pending = wait(pending, timeout=self._remaining(deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                raise LLMUnavailableError("LLM request timed out")
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    async def _ahedged(self, call: Callable[[], Awaitable[IntentResult]], deadline: float) -> IntentResult:
+        """Async _hedged. The slower request is cancelled as soon as one returns a valid result."""
+        delay = self._hedge_delay()
+        if delay is None:
+            return await call()
+        tasks = {asyncio.ensure_future(call())}
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tasks.add(asyncio.ensure_future(call()))
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, timeout=self._remaining(deadline), return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    raise LLMUnavailableError("LLM request timed out")
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    def _hedge_delay(self) -> float | None:
+        """Observed p95 latency once enough calls completed, LLMConfig.hedge_after until then; None when hedging is off."""
+        if self.hedge_after is None:
+            return None
+        latencies = sorted(self._latencies)
+        if len(latencies) < HEDGE_MIN_SAMPLES:
+            return self.hedge_after
+        return latencies[int(0.95 * (len(latencies) - 1))]
+
+    def _get_hedge_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(thread_name_prefix="llm-hedge")
+            return self._hedge_executor
+
+    def _retry_delay(self, attempt: int, deadline: float) -> float | None:
+        """Jittered backoff before the next attempt, or None when no attempt is left or it could not start before the deadline."""
+        if attempt >= self.max_retries:
+            return None
+        delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+        return delay if time.monotonic() + delay < deadline else None
+
+    def _attempt_timeout(self, deadline: float) -> float:
+        remaining = self._remaining(deadline)
+        return min(self.attempt_timeout, remaining) if self.attempt_timeout else remaining
+
+    def _remaining(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMUnavailableError("LLM request timed out")
+        return remaining
+
+    def _request(self, prompt: str, context: IntentContext) -> dict[str, Any]:
+        # Everything before the user message is byte-identical across requests for the same catalog (unless it
+        # is pruned to the token budget), which lets the provider reuse its cached prompt prefix
+        return {
+            "model": self.model,
+            "messages": [
                 {"role": "system", "content": SYSTEM_PROMPT},
-                {"role": "user", "content": f"{context_message}\n\nRequest: {prompt}"},
+                {"role": "system", "content": self._context_message(context, prompt)},
+                {"role": "user", "content": f"Request: {prompt}"},
             ],
-            max_tokens=self.max_tokens,
-            temperature=self.temperature,
-            response_format={"type": "json_object"},
-        )
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "response_format": {"type": "json_object"},
+        }
+
+    def _context_message(self, context: IntentContext, prompt: str) -> str:
+        """The catalog message. A catalog over context_tokens only lists the datasets ranked best for the prompt that fit."""
+        rendered = self._rendered_context
+        if rendered is None or context.version is None or rendered[0] != context.version:
+            lines = {
+                name: f"  {name}: metrics=[{', '.join(meta['metrics'])}], dimensions=[{', '.join(meta['dimensions'])}]"
+                for name, meta in context.datasets.items()
+            }
+            full = self._render_context(lines.values(), context)
+            index = CatalogIndex(context.datasets) if self.context_tokens is not None and estimate_tokens(full) > self.context_tokens else None
+            rendered = (context.version, full, lines, index)
+            if context.version is not None:
+                self._rendered_context = rendered
+
+        _, full, lines, index = rendered
+        if index is None:
+            return full
+        budget = self.context_tokens - estimate_tokens(self._render_context([], context))
+        selected: list[str] = []
+        for name, _ in index.rank(prompt):
+            cost = estimate_tokens(lines[name]) + 1
+            # The best match is always listed; after it, smaller datasets may still fit where a larger one did not
+            if selected and cost > budget:
+                continue
+            selected.append(lines[name])
+            budget -= cost
+        return self._render_context(selected, context)
+
+    def _render_context(self, lines: Iterable[str], context: IntentContext) -> str:
+        dataset_info = "\n".join(lines)
+        return f"Available datasets:\n{dataset_info}\nChart types: {', '.join(context.available_chart_types)}"
 
-        raw_response = response.choices[0].message.content
+    def _to_result(self, raw_response: str | None) -> IntentResult:
         if not raw_response:
             raise ValueError("No response from OpenAI")
 
@@ -88,6 +344,7 @@ class OpenAIProvider(LLMProvider):
         metrics = [Metric(field=m["field"], aggregation=m["aggregation"], label=m.get("label")) for m in data.get("metrics", [])]
         dimensions = [Dimension(field=d["field"], granularity=d.get("granularity")) for d in data.get("dimensions", [])] if data.get("dimensions") else None
         filters = [Filter(field=f["field"], operator=f["operator"], value=f["value"]) for f in data.get("filters", [])] if data.get("filters") else None
+        limit = data.get("limit")
 
         return ChartIntent(
             dataset=data["dataset"],
@@ -96,4 +353,8 @@ class OpenAIProvider(LLMProvider):
             dimensions=dimensions,
             filters=filters,
             title=data.get("title"),
+            sort_by=data.get("sortBy"),
+            sort_order=data.get("sortOrder") if data.get("sortOrder") in ("asc", "desc") else None,
+            limit=limit if isinstance(limit, int) and limit > 0 else None,
+            show_other=data.get("showOther") is True,
         )
@@ -0,0 +1,142 @@
+"""Pre-aggregated rollups over in-memory datasets."""
+
+import asyncio
+import threading
+from typing import Any, Iterable
+
+from .adapters import DataAdapter, MOCK_DATA, DATASET_METADATA, bucket_groups, build_grouped_chart_data, build_totals_chart_data, rank_groups
+from .aggregation import GroupAggregator
+from .filters import compile_value_predicate
+from .types import ChartIntent, ChartData, Dataset
+
+# Stands in for a field the record does not have, which groups as "Unknown" (an explicit None groups as "None")
+_MISSING = object()
+
+
+def _label(value: Any) -> str:
+    return "Unknown" if value is _MISSING else str(value)
+
+
+class RollupCube:
+    """Sum/count/min/max of every metric per distinct combination of a few dimension values, updated as records arrive.
+
+    Groups of a date field are its finest buckets (one per date), so day, week, month, quarter and year charts are all
+    rolled up from them instead of rescanning records.
+    """
+
+    def __init__(self, dimensions: tuple[str, ...], metrics: list[str]):
+        self.dimensions = dimensions
+        self.aggregator = GroupAggregator(metrics)
+
+    def add(self, records: Iterable[dict]) -> None:
+        dimensions, aggregator = self.dimensions, self.aggregator
+        for record in records:
+            aggregator.add(tuple(record.get(d, _MISSING) for d in dimensions), record)
+
+    def answers(self, intent: ChartIntent) -> bool:
+        """True when every grouped and filtered field is one of the cube's dimensions and every metric is rolled up."""
+        fields = {f.field for f in intent.filters or []} | {d.field for d in (intent.dimensions or [])[:2]}
+        return fields <= set(self.dimensions) and all(m.field in self.aggregator.fields for m in intent.metrics)
+
+    def query(self, intent: ChartIntent) -> ChartData:
+        """Aggregate the intent from the cube's groups. Groups keep first-seen order, so labels come out as in a full scan."""
+        groups = self.aggregator.groups
+        for f in intent.filters or []:
+            test, position = compile_value_predicate(f), self.dimensions.index(f.field)
+            groups = {key: acc for key, acc in groups.items() if test(None if key[position] is _MISSING else key[position])}
+        selected = GroupAggregator(self.aggregator.fields)
+        selected.groups = groups
+
+        field_index = [self.aggregator.fields.index(m.field) for m in intent.metrics]
+        if not intent.dimensions:
+            totals = selected.regroup(lambda key: None)
+            return build_totals_chart_data(intent, [totals.result(None, i, m.aggregation) for i, m in zip(field_index, intent.metrics)])
+
+        positions = [self.dimensions.index(d.field) for d in intent.dimensions[:2]]
+        series_of = (lambda key: _label(key[positions[1]])) if len(positions) > 1 else (lambda key: None)
+        if intent.dimensions[0].granularity:
+            # Keyed on the raw date, as bucket_groups expects; a missing date is a record without one
+            dated = selected.regroup(lambda key: (None if key[positions[0]] is _MISSING else key[positions[0]], series_of(key)))
+            labels, merged = bucket_groups(dated, intent.dimensions[0].granularity)
+        else:
+            merged = selected.regroup(lambda key: (_label(key[positions[0]]), series_of(key)))
+            labels = list(dict.fromkeys(key[0] for key in merged.groups))
+        labels, merged = rank_groups(intent, merged, labels, field_index)
+        return build_grouped_chart_data(intent, merged, labels, field_index)
+
+
+class RollupDataAdapter(DataAdapter):
+    """Answers intents from rollup cubes in O(groups) and passes everything else to the wrapped adapter.
+
+    One cube is built per dimension of each dataset, plus one per configured tuple of dimensions so that
+    intents filtering on another dimension can be answered too. The wrapped adapter must serve the same records.
+    """
+
+    def __init__(
+        self,
+        adapter: DataAdapter,
+        data: dict[Dataset, list[dict]] | None = None,
+        metadata: dict[Dataset, dict[str, list[str]]] | None = None,
+        combinations: dict[Dataset, list[tuple[str, ...]]] | None = None,
+    ):
+        self.adapter = adapter
+        metadata = DATASET_METADATA if metadata is None else metadata
+        data = MOCK_DATA if data is None else data
+        self.cubes: dict[Dataset, list[RollupCube]] = {}
+        # Appends update accumulators in place, so cube reads and writes are serialized
+        self._lock = threading.Lock()
+        for dataset, records in data.items():
+            if not records:
+                continue
+            meta = metadata.get(dataset, {})
+            dimension_sets = [(d,) for d in meta.get("dimensions", [])] + [tuple(c) for c in (combinations or {}).get(dataset, [])]
+            self.cubes[dataset] = [RollupCube(dimensions, meta.get("metrics", [])) for dimensions in dimension_sets]
+            for cube in self.cubes[dataset]:
+                cube.add(records)
+
+    def get_available_datasets(self) -> list[Dataset]:
+        return self.adapter.get_available_datasets()
+
+    def get_available_metrics(self, dataset: Dataset) -> list[str]:
+        return self.adapter.get_available_metrics(dataset)
+
+    def get_available_dimensions(self, dataset: Dataset) -> list[str]:
+        return self.adapter.get_available_dimensions(dataset)
+
+    def get_catalog_version(self) -> str | None:
+        return self.adapter.get_catalog_version()
+
+    def execute_query(self, intent: ChartIntent) -> ChartData:
+        result = self.query_cubes(intent)
+        return result if result is not None else self.adapter.execute_query(intent)
+
+    async def aexecute_query(self, intent: ChartIntent) -> ChartData:
+        # The lock can be held by an append for a whole batch, so wait for it off the event loop
+        result = await asyncio.to_thread(self.query_cubes, intent)
+        return result if result is not None else await self.adapter.aexecute_query(intent)
+
+    def query_cubes(self, intent: ChartIntent) -> ChartData | None:
+        """Answer the intent from the smallest matching cube, or None when no cube can."""
+        with self._lock:
+            cube = self.find_cube(intent)
+            return cube.query(intent) if cube else None
+
+    def find_cube(self, intent: ChartIntent) -> RollupCube | None:
+        """The smallest cube that can answer the intent, or None."""
+        candidates = [cube for cube in self.cubes.get(intent.dataset, []) if cube.answers(intent)]
+        return min(candidates, key=lambda cube: len(cube.aggregator.groups), default=None)
+
+    @property
+    def supports_append(self) -> bool:
+        return self.adapter.supports_append
+
+    def append_records(self, dataset: Dataset, records: list[dict[str, Any]]) -> None:
+        """Append records to the wrapped adapter and fold them into the dataset's cubes."""
+        self.adapter.append_records(dataset, records)
+        self.add_records(dataset, records)
+
+    def add_records(self, dataset: Dataset, records: list[dict[str, Any]]) -> None:
+        """Fold newly appended records into the dataset's cubes. Only the affected groups are touched."""
+        with self._lock:
+            for cube in self.cubes.get(dataset, []):
+                cube.add(records)
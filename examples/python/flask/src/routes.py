@@ -1,8 +1,54 @@
 """API routes for PromptChart."""
 
-from flask import Blueprint, request, jsonify
+import hmac
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from .adapters import AppendNotSupportedError, DataAdapter
+from .arrow import ARROW_STREAM, accepts_arrow, response_to_arrow
+from .ingest import append_stream, read_csv, read_jsonl
 from .intent_resolver import IntentResolver
-from .types import response_to_dict
+from .llm import LLMUnavailableError
+from .serialization import compress, dumps
+from .types import ChartResponse, response_to_dict, sse_event
+
+# Maximum number of prompts accepted by the batch endpoint
+MAX_BATCH_SIZE = 50
+
+
+def error_status(error: Exception) -> tuple[int, str]:
+    """HTTP status and error code for a failed chart request."""
+    if isinstance(error, LLMUnavailableError):
+        return 503, "LLM_UNAVAILABLE"
+    return 500, "INTERNAL_ERROR"
+
+
+def ingest_error_status(error: Exception) -> tuple[int, str]:
+    """HTTP status and error code for a failed ingest request."""
+    if isinstance(error, AppendNotSupportedError):
+        return 405, "APPEND_NOT_SUPPORTED"
+    if isinstance(error, (ValueError, UnicodeDecodeError)):
+        return 400, "INVALID_REQUEST"
+    return 500, "INTERNAL_ERROR"
+
+
+def authorized(header: str | None, token: str) -> bool:
+    """Whether an Authorization header carries the bearer token (compared in constant time)."""
+    scheme, _, value = (header or "").partition(" ")
+    return scheme.lower() == "bearer" and hmac.compare_digest(value.strip().encode(), token.encode())
+
+
+def batch_item_to_dict(result: ChartResponse | Exception) -> dict:
+    if isinstance(result, Exception):
+        print(f"Chart generation error: {result}")
+        return {"error": str(result), "code": error_status(result)[1]}
+    return response_to_dict(result)
+
+
+def json_response(payload: dict) -> Response:
+    """Encode the payload straight to (optionally compressed) bytes instead of going through jsonify."""
+    body, encoding = compress(dumps(payload), request.headers.get("Accept-Encoding"))
+    headers = {"Vary": "Accept, Accept-Encoding", **({"Content-Encoding": encoding} if encoding else {})}
+    return Response(body, mimetype="application/json", headers=headers)
 
 
 def create_chart_blueprint(resolver: IntentResolver) -> Blueprint:
@@ -16,9 +62,63 @@ def create_chart_blueprint(resolver: IntentResolver) -> Blueprint:
                 return jsonify({"error": "Missing or invalid prompt", "code": "INVALID_REQUEST"}), 400
 
             result = resolver.resolve(data["prompt"], data.get("context"))
-            return jsonify(response_to_dict(result))
+            if accepts_arrow(request.headers.get("Accept")):
+                return Response(response_to_arrow(result), mimetype=ARROW_STREAM, headers={"Vary": "Accept, Accept-Encoding"})
+            return json_response(response_to_dict(result))
         except Exception as e:
             print(f"Chart generation error: {e}")
-            return jsonify({"error": str(e), "code": "INTERNAL_ERROR"}), 500
+            status, code = error_status(e)
+            return jsonify({"error": str(e), "code": code}), status
+
+    @bp.route("/stream", methods=["POST"])
+    def stream_chart():
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("prompt"), str):
+            return jsonify({"error": "Missing or invalid prompt", "code": "INVALID_REQUEST"}), 400
+
+        def events():
+            try:
+                for event, payload in resolver.stream(data["prompt"], data.get("context")):
+                    yield sse_event(event, payload)
+            except Exception as e:
+                print(f"Chart generation error: {e}")
+                yield sse_event("error", {"error": str(e), "code": error_status(e)[1]})
+
+        return Response(stream_with_context(events()), mimetype="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @bp.route("/batch", methods=["POST"])
+    def generate_charts():
+        data = request.get_json(silent=True)
+        prompts = data.get("prompts") if isinstance(data, dict) else None
+        if not isinstance(prompts, list) or not all(isinstance(p, str) for p in prompts) or not 0 < len(prompts) <= MAX_BATCH_SIZE:
+            return jsonify({"error": f"Expected 1 to {MAX_BATCH_SIZE} prompts", "code": "INVALID_REQUEST"}), 400
+
+        results = resolver.resolve_batch(prompts, data.get("context"))
+        return json_response({"results": [batch_item_to_dict(result) for result in results]})
+
+    return bp
+
+
+def create_ingest_blueprint(adapter: DataAdapter, token: str) -> Blueprint:
+    """Routes writing records into the adapter. Every request must send "Authorization: Bearer <token>"."""
+    bp = Blueprint("ingest", __name__)
+
+    @bp.route("/<dataset>/records", methods=["POST"])
+    def append_records(dataset: str):
+        """Append a JSONL body (or CSV with a header row when sent as text/csv) to a dataset."""
+        if not authorized(request.headers.get("Authorization"), token):
+            return jsonify({"error": "Missing or invalid ingest token", "code": "UNAUTHORIZED"}), 401
+        if dataset not in adapter.get_available_datasets():
+            return jsonify({"error": f"Unknown dataset: {dataset}", "code": "UNKNOWN_DATASET"}), 404
+        try:
+            lines = request.get_data().decode().splitlines()
+            is_csv = (request.content_type or "").startswith("text/csv")
+            records = read_csv(lines, adapter.get_available_metrics(dataset)) if is_csv else read_jsonl(lines)
+            appended = append_stream(adapter, dataset, records)
+        except Exception as e:
+            print(f"Ingest error: {e}")
+            status, code = ingest_error_status(e)
+            return jsonify({"error": str(e), "code": code}), status
+        return jsonify({"appended": appended})
 
     return bp
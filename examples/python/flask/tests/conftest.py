@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the app as the `src` package, the same way it is run (python -m src.app)
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
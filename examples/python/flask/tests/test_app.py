@@ -0,0 +1,14 @@
+"""Importing the entry module must not build the app, since spawned worker processes re-import it."""
+
+import runpy
+
+import flask
+
+
+def test_worker_import_does_not_build_the_app(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("app built on import")
+
+    monkeypatch.setattr(flask.Flask, "__init__", fail)
+    # What a spawned multiprocessing child does with the parent's `python -m src.app` entry module
+    runpy.run_module("src.app", run_name="__mp_main__")
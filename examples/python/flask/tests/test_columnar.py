@@ -0,0 +1,80 @@
+"""ColumnarDataAdapter must draw the same charts as MockDataAdapter, with and without indexes and after appends."""
+
+import random
+
+import pytest
+
+from src.adapters import MockDataAdapter
+from src.columnar import REINDEX_MIN_ROWS, ColumnarDataAdapter
+from src.types import ChartData, ChartIntent, Dimension, Filter, Metric
+
+METADATA = {"sales": {"metrics": ["revenue", "quantity"], "dimensions": ["region", "category", "year"]}}
+REGIONS = ["North", "South", "East", "West", "Central", "Islands"]
+CATEGORIES = ["Electronics", "Clothing", "Food", "Toys", "Garden", "Books", "Sports", "Music"]
+
+
+def records(count: int, seed: int) -> list[dict]:
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(count):
+        row = {"region": rng.choice(REGIONS), "category": rng.choice(CATEGORIES), "year": rng.choice([2022, 2023, 2024]), "revenue": rng.randint(1, 1000)}
+        # Some rows miss the quantity metric or the category, like hand-written records do
+        if rng.random() < 0.8:
+            row["quantity"] = rng.randint(1, 50)
+        if rng.random() < 0.05:
+            del row["category"]
+        rows.append(row)
+    return rows
+
+
+DATA = {"sales": records(400, seed=1)}
+# Narrow enough for the indexes to be used, broad ones fall back to a scan
+FILTERS = [
+    [],
+    [Filter(field="region", operator="eq", value="North")],
+    [Filter(field="region", operator="neq", value="North")],
+    [Filter(field="category", operator="in", value=["Toys", "Books"])],
+    [Filter(field="revenue", operator="gt", value=900)],
+    [Filter(field="revenue", operator="lte", value=100)],
+    [Filter(field="revenue", operator="between", value=[200, 260])],
+    [Filter(field="year", operator="gte", value=2024), Filter(field="region", operator="in", value=["East", "West"])],
+    [Filter(field="region", operator="eq", value="Nowhere")],
+]
+DIMENSIONS = [[], [Dimension(field="region")], [Dimension(field="category")], [Dimension(field="year"), Dimension(field="region")]]
+
+
+@pytest.fixture(params=[True, False], ids=["indexed", "scan"])
+def adapters(request) -> tuple[MockDataAdapter, ColumnarDataAdapter]:
+    data = {name: list(rows) for name, rows in DATA.items()}
+    return MockDataAdapter(data), ColumnarDataAdapter(data, metadata=METADATA, indexed=request.param)
+
+
+def chart(data: ChartData) -> tuple[list[str], list[tuple[str, list[float]]]]:
+    return data.labels, [(dataset.label, [pytest.approx(float(value)) for value in dataset.data]) for dataset in data.datasets]
+
+
+def intents() -> list[ChartIntent]:
+    return [
+        ChartIntent(dataset="sales", chart_type="bar", metrics=[Metric(field="revenue", aggregation=aggregation), Metric(field="quantity", aggregation="avg")],
+                    dimensions=dimensions or None, filters=filters or None)
+        for filters in FILTERS for dimensions in DIMENSIONS for aggregation in ("sum", "avg", "min", "max", "count")
+    ]
+
+
+def test_matches_mock_adapter(adapters):
+    mock, columnar = adapters
+    for intent in intents():
+        assert chart(columnar.execute_query(intent)) == chart(mock.execute_query(intent)), intent
+
+
+@pytest.mark.parametrize("count", [50, REINDEX_MIN_ROWS + 100], ids=["scanned", "reindexed"])
+def test_appended_records_are_queried(adapters, count):
+    mock, columnar = adapters
+    appended = records(count, seed=2)
+    appended[0]["region"] = "Antarctica"
+    mock.append_records("sales", appended)
+    columnar.append_records("sales", appended)
+    for intent in intents():
+        assert chart(columnar.execute_query(intent)) == chart(mock.execute_query(intent)), intent
+    only_new = ChartIntent(dataset="sales", chart_type="bar", metrics=[Metric(field="revenue", aggregation="sum")], filters=[Filter(field="region", operator="eq", value="Antarctica")])
+    assert chart(columnar.execute_query(only_new)) == chart(mock.execute_query(only_new))
@@ -0,0 +1,92 @@
+"""SingleFlight must run overlapping calls with the same key once and share the outcome with every caller."""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.singleflight import SingleFlight
+
+
+def test_threads_share_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def work() -> int:
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return 42
+
+    with ThreadPoolExecutor(4) as pool:
+        leader = pool.submit(flight.do, "key", work)
+        assert started.wait(5)
+        followers = [pool.submit(flight.do, "key", work) for _ in range(3)]
+        while flight.stats()["coalesced"] < 3:
+            time.sleep(0.001)
+        release.set()
+        assert [f.result(5) for f in [leader, *followers]] == [42] * 4
+    assert len(calls) == 1
+    assert flight.stats() == {"calls": 1, "coalesced": 3}
+
+
+def test_threads_share_exceptions_and_forget_finished_calls():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def fail() -> int:
+        started.set()
+        release.wait(5)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(2) as pool:
+        leader = pool.submit(flight.do, "key", fail)
+        assert started.wait(5)
+        follower = pool.submit(flight.do, "key", fail)
+        while flight.stats()["coalesced"] < 1:
+            time.sleep(0.001)
+        release.set()
+        for future in (leader, follower):
+            with pytest.raises(ValueError, match="boom"):
+                future.result(5)
+    # Later calls run again rather than reusing the failure
+    assert flight.do("key", lambda: 1) == 1
+    assert flight.stats() == {"calls": 2, "coalesced": 1}
+
+
+def test_coroutines_share_one_call_per_key():
+    flight = SingleFlight()
+    calls = []
+
+    async def work(value: int) -> int:
+        calls.append(value)
+        await asyncio.sleep(0.01)
+        return value
+
+    async def scenario() -> list[int]:
+        return await asyncio.gather(*(flight.ado(key, lambda key=key: work(key)) for key in (1, 1, 2, 1, 2)))
+
+    assert asyncio.run(scenario()) == [1, 1, 2, 1, 2]
+    assert sorted(calls) == [1, 2]
+    assert flight.stats() == {"calls": 2, "coalesced": 3}
+
+
+def test_cancelled_caller_does_not_cancel_the_call():
+    flight = SingleFlight()
+
+    async def work() -> str:
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def scenario() -> str:
+        first = asyncio.create_task(flight.ado("key", work))
+        second = asyncio.create_task(flight.ado("key", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
+    assert flight.stats() == {"calls": 1, "coalesced": 1}